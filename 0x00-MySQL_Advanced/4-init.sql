@@ -4,7 +4,8 @@ DROP TABLE IF EXISTS orders;
 
 CREATE TABLE IF NOT EXISTS items (
     name VARCHAR(255) NOT NULL,
-    quantity int NOT NULL DEFAULT 10
+    quantity int NOT NULL DEFAULT 10,
+    INDEX idx_items_name (name)
 );
 
 CREATE TABLE IF NOT EXISTS orders (
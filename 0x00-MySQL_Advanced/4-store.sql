@@ -1,15 +1,19 @@
 -- trigger that decreases the quantity of an item after adding a new order.
 -- Quantity in the table items can be negative.
+-- Skipped while @batch_ingest is set: IngestStagedOrders
+-- (8-batch_orders.sql) updates the quantities of a whole batch at once.
 DELIMITER //
 CREATE TRIGGER decrease_item_quantity
 AFTER INSERT
 ON orders
 FOR EACH ROW
 BEGIN
-    -- Decrease the quantity of the associated item in the items table
-    UPDATE items
-    SET quantity = quantity - NEW.number
-    WHERE name = NEW.item_name;
+    IF @batch_ingest IS NULL THEN
+        -- Decrease the quantity of the associated item in the items table
+        UPDATE items
+        SET quantity = quantity - NEW.number
+        WHERE name = NEW.item_name;
+    END IF;
 END;
 //
 DELIMITER ;
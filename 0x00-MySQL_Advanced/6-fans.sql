@@ -0,0 +1,6 @@
+-- ranks country origins of bands, ordered by the number of (non-unique) fans,
+-- read from the origin_fans summary of 6-origin_fans.sql (an index scan)
+
+SELECT origin, nb_fans
+FROM origin_fans
+ORDER BY nb_fans DESC;
@@ -0,0 +1,21 @@
+-- Show the ranking, change bands and check the summary
+SELECT origin, nb_fans, nb_bands FROM origin_fans ORDER BY nb_fans DESC LIMIT 3;
+SELECT origin, nb_fans FROM origin_fans WHERE origin = '';
+EXPLAIN SELECT origin, nb_fans FROM origin_fans ORDER BY nb_fans DESC;
+
+INSERT INTO metal_bands (band_name, fans, formed, origin, style) VALUES ('Test band', 100000, 2020, 'Sweden', 'Heavy');
+UPDATE metal_bands SET origin = 'Atlantis' WHERE band_name = 'Test band';
+UPDATE metal_bands SET fans = fans + 1 WHERE origin = 'Finland';
+INSERT INTO metal_bands (band_name, fans, formed, origin, style) VALUES ('Nowhere band', 10, 2020, NULL, 'Heavy');
+
+SELECT "--";
+SELECT origin, nb_fans, nb_bands FROM origin_fans ORDER BY nb_fans DESC LIMIT 3;
+CALL CheckOriginFans();
+
+SELECT origin, nb_fans, nb_bands FROM origin_fans WHERE origin IS NULL OR origin = '';
+
+DELETE FROM metal_bands WHERE band_name IN ('Test band', 'Nowhere band');
+
+SELECT "--";
+SELECT origin, nb_fans, nb_bands FROM origin_fans WHERE origin = 'Atlantis';
+CALL CheckOriginFans();
@@ -0,0 +1,125 @@
+-- SQL script that materializes the fans ranking of 2-fans.sql:
+-- a summary table origin_fans, indexed on nb_fans and kept current by
+-- INSERT, UPDATE and DELETE triggers on metal_bands, a procedure
+-- RebuildOriginFans to backfill it and a procedure CheckOriginFans
+-- listing the origins where it differs from the live GROUP BY.
+-- metal_bands.sql drops metal_bands and its triggers: run this script
+-- again after importing it. Origins are stored as they are, NULL
+-- apart from '' like GROUP BY origin does: the key origin_key is ''
+-- for NULL and the origin prefixed with '=' otherwise.
+
+DROP TABLE IF EXISTS origin_fans;
+CREATE TABLE origin_fans (
+    origin VARCHAR(255),
+    origin_key VARCHAR(256) AS (IFNULL(CONCAT('=', origin), '')) STORED
+        NOT NULL,
+    nb_fans BIGINT NOT NULL DEFAULT 0,
+    nb_bands INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (origin_key),
+    INDEX idx_nb_fans (nb_fans)
+);
+
+DROP TRIGGER IF EXISTS origin_fans_after_insert;
+DROP TRIGGER IF EXISTS origin_fans_after_update;
+DROP TRIGGER IF EXISTS origin_fans_after_delete;
+DROP PROCEDURE IF EXISTS RebuildOriginFans;
+DROP PROCEDURE IF EXISTS CheckOriginFans;
+
+DELIMITER //
+CREATE TRIGGER origin_fans_after_insert
+AFTER INSERT
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    -- Add the band to the total of its origin
+    INSERT INTO origin_fans (origin, nb_fans, nb_bands)
+    VALUES (NEW.origin, IFNULL(NEW.fans, 0), 1)
+    ON DUPLICATE KEY UPDATE
+        nb_fans = nb_fans + VALUES(nb_fans),
+        nb_bands = nb_bands + 1;
+END;
+//
+
+CREATE TRIGGER origin_fans_after_update
+AFTER UPDATE
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.origin <=> OLD.origin) OR NOT (NEW.fans <=> OLD.fans) THEN
+        -- Move the band from its old total to its new one
+        UPDATE origin_fans
+        SET nb_fans = nb_fans - IFNULL(OLD.fans, 0),
+            nb_bands = nb_bands - 1
+        WHERE origin_key = IFNULL(CONCAT('=', OLD.origin), '');
+
+        INSERT INTO origin_fans (origin, nb_fans, nb_bands)
+        VALUES (NEW.origin, IFNULL(NEW.fans, 0), 1)
+        ON DUPLICATE KEY UPDATE
+            nb_fans = nb_fans + VALUES(nb_fans),
+            nb_bands = nb_bands + 1;
+
+        DELETE FROM origin_fans
+        WHERE origin_key = IFNULL(CONCAT('=', OLD.origin), '')
+          AND nb_bands = 0;
+    END IF;
+END;
+//
+
+CREATE TRIGGER origin_fans_after_delete
+AFTER DELETE
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    -- Remove the band from its total, and the origin once empty
+    UPDATE origin_fans
+    SET nb_fans = nb_fans - IFNULL(OLD.fans, 0),
+        nb_bands = nb_bands - 1
+    WHERE origin_key = IFNULL(CONCAT('=', OLD.origin), '');
+
+    DELETE FROM origin_fans
+    WHERE origin_key = IFNULL(CONCAT('=', OLD.origin), '')
+      AND nb_bands = 0;
+END;
+//
+
+CREATE PROCEDURE RebuildOriginFans()
+BEGIN
+    -- Recompute every total from metal_bands in one transaction
+    START TRANSACTION;
+    DELETE FROM origin_fans;
+    INSERT INTO origin_fans (origin, nb_fans, nb_bands)
+    SELECT origin, IFNULL(SUM(fans), 0), COUNT(*)
+    FROM metal_bands
+    GROUP BY origin;
+    COMMIT;
+END;
+//
+
+CREATE PROCEDURE CheckOriginFans()
+BEGIN
+    -- Origins whose totals differ from the live GROUP BY; none if the
+    -- summary is consistent
+    SELECT live.origin, live.nb_fans AS live_fans,
+           summary.nb_fans AS summary_fans
+    FROM (
+        SELECT origin, IFNULL(SUM(fans), 0) AS nb_fans,
+               COUNT(*) AS nb_bands
+        FROM metal_bands
+        GROUP BY origin
+    ) AS live
+    LEFT JOIN origin_fans AS summary ON summary.origin <=> live.origin
+    WHERE summary.origin_key IS NULL
+       OR summary.nb_fans <> live.nb_fans
+       OR summary.nb_bands <> live.nb_bands
+    UNION ALL
+    SELECT summary.origin, NULL, summary.nb_fans
+    FROM origin_fans AS summary
+    WHERE NOT EXISTS (
+        SELECT 1 FROM metal_bands
+        WHERE metal_bands.origin <=> summary.origin
+    );
+END;
+//
+DELIMITER ;
+
+CALL RebuildOriginFans();
@@ -0,0 +1,121 @@
+-- SQL script that normalizes the comma-separated style column of
+-- metal_bands into a band_styles junction table, so that style lookups
+-- and per-style longevity rankings are index reads:
+-- a stored lifespan generated column on metal_bands, indexed,
+-- band_styles (band_id, style, lifespan) indexed on (style, lifespan),
+-- triggers keeping band_styles in sync with metal_bands and
+-- procedures SplitBandStyles (one band) and RebuildBandStyles (all).
+-- Run it once after importing metal_bands.sql, which recreates
+-- metal_bands without the lifespan column and triggers.
+
+ALTER TABLE metal_bands
+    ADD COLUMN lifespan SMALLINT AS (IFNULL(split, 2022) - formed) STORED,
+    ADD INDEX idx_lifespan (lifespan);
+
+CREATE TABLE IF NOT EXISTS band_styles (
+    band_id INT NOT NULL,
+    style VARCHAR(255) NOT NULL,
+    lifespan SMALLINT,
+    PRIMARY KEY (band_id, style),
+    INDEX idx_style_lifespan (style, lifespan)
+);
+
+DROP TRIGGER IF EXISTS band_styles_after_insert;
+DROP TRIGGER IF EXISTS band_styles_after_update;
+DROP TRIGGER IF EXISTS band_styles_after_delete;
+DROP PROCEDURE IF EXISTS SplitBandStyles;
+DROP PROCEDURE IF EXISTS RebuildBandStyles;
+
+DELIMITER //
+CREATE PROCEDURE SplitBandStyles(
+    IN p_band_id INT, IN p_styles VARCHAR(255), IN p_lifespan SMALLINT)
+BEGIN
+    -- Insert one row per trimmed, non-empty style of the list
+    DECLARE rest VARCHAR(255) DEFAULT IFNULL(p_styles, '');
+    DECLARE item VARCHAR(255);
+    WHILE rest <> '' DO
+        SET item = TRIM(SUBSTRING_INDEX(rest, ',', 1));
+        IF LOCATE(',', rest) > 0 THEN
+            SET rest = SUBSTRING(rest, LOCATE(',', rest) + 1);
+        ELSE
+            SET rest = '';
+        END IF;
+        IF item <> '' THEN
+            INSERT INTO band_styles (band_id, style, lifespan)
+            VALUES (p_band_id, item, p_lifespan)
+            ON DUPLICATE KEY UPDATE lifespan = VALUES(lifespan);
+        END IF;
+    END WHILE;
+END;
+//
+
+CREATE PROCEDURE RebuildBandStyles()
+BEGIN
+    -- Split every band at once: the n-th style of each band, for n up
+    -- to its number of commas + 1 (at most 128 in a VARCHAR(255))
+    START TRANSACTION;
+    DELETE FROM band_styles;
+    INSERT INTO band_styles (band_id, style, lifespan)
+    SELECT metal_bands.id,
+           TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(metal_bands.style, ',', n.n),
+                                ',', -1)),
+           metal_bands.lifespan
+    FROM metal_bands
+    JOIN (
+        SELECT ones.d + tens.d * 10 + hundreds.d * 100 + 1 AS n
+        FROM (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2
+              UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL SELECT 5
+              UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8
+              UNION ALL SELECT 9) AS ones,
+             (SELECT 0 AS d UNION ALL SELECT 1 UNION ALL SELECT 2
+              UNION ALL SELECT 3 UNION ALL SELECT 4 UNION ALL SELECT 5
+              UNION ALL SELECT 6 UNION ALL SELECT 7 UNION ALL SELECT 8
+              UNION ALL SELECT 9) AS tens,
+             (SELECT 0 AS d UNION ALL SELECT 1) AS hundreds
+    ) AS n
+        ON n.n <= 1 + LENGTH(metal_bands.style)
+                    - LENGTH(REPLACE(metal_bands.style, ',', ''))
+    WHERE TRIM(SUBSTRING_INDEX(SUBSTRING_INDEX(metal_bands.style, ',', n.n),
+                               ',', -1)) <> ''
+    ON DUPLICATE KEY UPDATE lifespan = VALUES(lifespan);
+    COMMIT;
+END;
+//
+
+CREATE TRIGGER band_styles_after_insert
+AFTER INSERT
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    CALL SplitBandStyles(NEW.id, NEW.style, NEW.lifespan);
+END;
+//
+
+CREATE TRIGGER band_styles_after_update
+AFTER UPDATE
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    IF NOT (NEW.style <=> OLD.style) OR NEW.id <> OLD.id THEN
+        -- Split the new list again
+        DELETE FROM band_styles WHERE band_id = OLD.id;
+        CALL SplitBandStyles(NEW.id, NEW.style, NEW.lifespan);
+    ELSEIF NOT (NEW.lifespan <=> OLD.lifespan) THEN
+        UPDATE band_styles
+        SET lifespan = NEW.lifespan
+        WHERE band_id = NEW.id;
+    END IF;
+END;
+//
+
+CREATE TRIGGER band_styles_after_delete
+AFTER DELETE
+ON metal_bands
+FOR EACH ROW
+BEGIN
+    DELETE FROM band_styles WHERE band_id = OLD.id;
+END;
+//
+DELIMITER ;
+
+CALL RebuildBandStyles();
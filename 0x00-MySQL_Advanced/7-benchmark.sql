@@ -0,0 +1,49 @@
+-- Compare the plans and timings of 3-glam_rock.sql and 7-glam_rock.sql
+-- on metal_bands enlarged 64 times (about 311k bands).
+-- Destructive: run it on a scratch database loaded with metal_bands.sql
+-- and 7-band_styles.sql. EXPLAIN ANALYZE needs MySQL 8.0.18 or later
+-- (on MariaDB use ANALYZE SELECT ...).
+
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style)
+SELECT band_name, fans, formed, origin, split, style FROM metal_bands;
+ANALYZE TABLE metal_bands, band_styles;
+SELECT COUNT(*) AS bands FROM metal_bands;
+SELECT COUNT(*) AS band_styles FROM band_styles;
+
+-- Before: full scan of metal_bands and a filesort
+EXPLAIN SELECT band_name, (IFNULL(split, '2022') - formed) AS 'lifespan'
+FROM metal_bands
+WHERE style LIKE '%Glam rock%'
+ORDER BY lifespan DESC;
+EXPLAIN ANALYZE SELECT band_name, (IFNULL(split, '2022') - formed) AS 'lifespan'
+FROM metal_bands
+WHERE style LIKE '%Glam rock%'
+ORDER BY lifespan DESC;
+
+-- After: backward range scan of idx_style_lifespan, primary key lookups
+EXPLAIN SELECT metal_bands.band_name, band_styles.lifespan
+FROM band_styles
+JOIN metal_bands ON metal_bands.id = band_styles.band_id
+WHERE band_styles.style = 'Glam rock'
+ORDER BY band_styles.lifespan DESC;
+EXPLAIN ANALYZE SELECT metal_bands.band_name, band_styles.lifespan
+FROM band_styles
+JOIN metal_bands ON metal_bands.id = band_styles.band_id
+WHERE band_styles.style = 'Glam rock'
+ORDER BY band_styles.lifespan DESC;
+
+-- Longest-lived bands of any style: backward scan of idx_lifespan
+EXPLAIN SELECT band_name, lifespan
+FROM metal_bands
+ORDER BY lifespan DESC
+LIMIT 10;
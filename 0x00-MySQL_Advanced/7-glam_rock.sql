@@ -0,0 +1,8 @@
+-- SQL script that lists all bands with Glam rock as their main style, ranked by their longevity,
+-- read from band_styles of 7-band_styles.sql (a range scan of idx_style_lifespan, no filesort)
+
+SELECT metal_bands.band_name, band_styles.lifespan
+FROM band_styles
+JOIN metal_bands ON metal_bands.id = band_styles.band_id
+WHERE band_styles.style = 'Glam rock'
+ORDER BY band_styles.lifespan DESC;
@@ -0,0 +1,16 @@
+-- Show the styles of a band, change it and rank a style by longevity
+SELECT * FROM band_styles WHERE band_id = (SELECT id FROM metal_bands WHERE band_name = 'Megadeth');
+
+INSERT INTO metal_bands (band_name, fans, formed, origin, split, style) VALUES ('Test band', 1, 1960, 'USA', 2000, 'Glam rock , Heavy');
+UPDATE metal_bands SET style = 'Glam rock,Hard rock', split = NULL WHERE band_name = 'Test band';
+
+SELECT "--";
+SELECT * FROM band_styles WHERE band_id = (SELECT id FROM metal_bands WHERE band_name = 'Test band');
+SELECT metal_bands.band_name, band_styles.lifespan
+FROM band_styles JOIN metal_bands ON metal_bands.id = band_styles.band_id
+WHERE band_styles.style = 'Glam rock' ORDER BY band_styles.lifespan DESC;
+
+DELETE FROM metal_bands WHERE band_name = 'Test band';
+
+SELECT "--";
+SELECT COUNT(*) FROM band_styles WHERE style = 'Hard rock' AND band_id NOT IN (SELECT id FROM metal_bands);
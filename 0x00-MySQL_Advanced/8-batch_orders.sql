@@ -0,0 +1,44 @@
+-- SQL script that creates a stored procedure IngestStagedOrders that adds
+-- a batch of orders and decreases the quantities of their items with one
+-- set-based UPDATE, in a single transaction, instead of one UPDATE per
+-- order from the decrease_item_quantity trigger (4-store.sql).
+-- The final quantities are the same as through the trigger.
+-- The batch is read from a session table the caller fills first:
+--     CREATE TEMPORARY TABLE orders_staging LIKE orders;
+--     INSERT INTO orders_staging (item_name, number) VALUES ...;
+--     CALL IngestStagedOrders();
+-- The staging table is emptied by a successful call.
+DROP PROCEDURE IF EXISTS IngestStagedOrders;
+
+DELIMITER //
+CREATE PROCEDURE IngestStagedOrders()
+BEGIN
+    DECLARE EXIT HANDLER FOR SQLEXCEPTION
+    BEGIN
+        ROLLBACK;
+        SET @batch_ingest = NULL;
+        RESIGNAL;
+    END;
+
+    START TRANSACTION;
+    -- Keep decrease_item_quantity from updating items once per order
+    SET @batch_ingest = 1;
+
+    INSERT INTO orders (item_name, number)
+    SELECT item_name, number FROM orders_staging;
+
+    -- One keyed update per item of the batch
+    UPDATE items
+    JOIN (
+        SELECT item_name, SUM(number) AS total
+        FROM orders_staging
+        GROUP BY item_name
+    ) AS batch ON items.name = batch.item_name
+    SET items.quantity = items.quantity - batch.total;
+
+    DELETE FROM orders_staging;
+    SET @batch_ingest = NULL;
+    COMMIT;
+END;
+//
+DELIMITER ;
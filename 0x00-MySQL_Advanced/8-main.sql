@@ -0,0 +1,19 @@
+-- Show and add a batch of orders
+SELECT * FROM items;
+SELECT * FROM orders;
+
+CREATE TEMPORARY TABLE orders_staging LIKE orders;
+INSERT INTO orders_staging (item_name, number) VALUES ('apple', 1), ('apple', 3), ('pear', 2);
+CALL IngestStagedOrders();
+
+SELECT "--";
+
+SELECT * FROM items;
+SELECT * FROM orders;
+
+-- The trigger still handles single orders
+INSERT INTO orders (item_name, number) VALUES ('pineapple', 4);
+
+SELECT "--";
+
+SELECT * FROM items;
@@ -0,0 +1,64 @@
+-- SQL script that logs every change of the users table to user_changes,
+-- for the Redis cache of user_cache.py to invalidate the entries of the
+-- changed users, including the valid_email reset of reset_valid_email
+-- (5-valid_email.sql): the log is written after the BEFORE UPDATE
+-- trigger ran, in the same transaction as the change.
+-- PruneUserChanges deletes the entries older than a number of seconds.
+
+CREATE TABLE IF NOT EXISTS user_changes (
+    seq BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    user_id INT NOT NULL,
+    old_email VARCHAR(255),
+    new_email VARCHAR(255),
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_changed_at (changed_at)
+);
+
+DROP TRIGGER IF EXISTS user_changes_after_insert;
+DROP TRIGGER IF EXISTS user_changes_after_update;
+DROP TRIGGER IF EXISTS user_changes_after_delete;
+DROP PROCEDURE IF EXISTS PruneUserChanges;
+
+DELIMITER //
+CREATE TRIGGER user_changes_after_insert
+AFTER INSERT
+ON users
+FOR EACH ROW
+BEGIN
+    -- A new user replaces cached "not found" answers
+    INSERT INTO user_changes (user_id, old_email, new_email)
+    VALUES (NEW.id, NULL, NEW.email);
+END;
+//
+
+CREATE TRIGGER user_changes_after_update
+AFTER UPDATE
+ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO user_changes (user_id, old_email, new_email)
+    VALUES (NEW.id, OLD.email, NEW.email);
+    IF NEW.id <> OLD.id THEN
+        INSERT INTO user_changes (user_id, old_email, new_email)
+        VALUES (OLD.id, OLD.email, NULL);
+    END IF;
+END;
+//
+
+CREATE TRIGGER user_changes_after_delete
+AFTER DELETE
+ON users
+FOR EACH ROW
+BEGIN
+    INSERT INTO user_changes (user_id, old_email, new_email)
+    VALUES (OLD.id, OLD.email, NULL);
+END;
+//
+
+CREATE PROCEDURE PruneUserChanges(IN keep_seconds INT)
+BEGIN
+    DELETE FROM user_changes
+    WHERE changed_at < NOW() - INTERVAL keep_seconds SECOND;
+END;
+//
+DELIMITER ;
@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+"""
+Compare adding orders one trigger UPDATE at a time with the batched
+IngestStagedOrders path, on a local MySQL or MariaDB server loaded with
+4-init.sql, 4-store.sql and 8-batch_orders.sql.
+
+Destructive: items and orders are recreated.
+Usage: ./bench_orders.py user password database [orders] [items]
+"""
+import random
+import sys
+import time
+import MySQLdb
+from orders_loader import ingest_orders
+
+
+def reset(db, items):
+    """ Recreate `items` items and no orders """
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM orders")
+    cursor.execute("DELETE FROM items")
+    cursor.executemany("INSERT INTO items (name) VALUES (%s)",
+                       ["item{}".format(i) for i in range(items)])
+    db.commit()
+    cursor.close()
+
+
+def quantities(db):
+    """ Return the quantity of every item """
+    cursor = db.cursor()
+    cursor.execute("SELECT name, quantity FROM items ORDER BY name")
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+
+def through_trigger(db, orders, batch_size=1000):
+    """ Multi-row INSERTs into orders, one trigger UPDATE per order """
+    cursor = db.cursor()
+    for i in range(0, len(orders), batch_size):
+        cursor.executemany("INSERT INTO orders (item_name, number) "
+                           "VALUES (%s, %s)", orders[i:i + batch_size])
+        db.commit()
+    cursor.close()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 100000
+    items = int(sys.argv[5]) if len(sys.argv) > 5 else 1000
+    db = MySQLdb.connect(user=sys.argv[1], passwd=sys.argv[2],
+                         db=sys.argv[3], host='localhost')
+    orders = [("item{}".format(random.randrange(items)),
+               random.randint(1, 5)) for _ in range(count)]
+
+    results = []
+    for label, run in (("trigger", through_trigger),
+                       ("IngestStagedOrders", ingest_orders)):
+        reset(db, items)
+        start = time.perf_counter()
+        run(db, orders)
+        elapsed = time.perf_counter() - start
+        results.append(quantities(db))
+        print("{:<20} {:>8} orders {:>8.2f}s {:>10.0f} orders/sec".format(
+            label, count, elapsed, count / elapsed))
+
+    print("same quantities: {}".format(results[0] == results[1]))
+    db.close()
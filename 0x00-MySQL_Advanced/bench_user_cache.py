@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+"""
+Compare MySQL query load and lookup latency of users read by id
+straight from MySQL and through UserCache, on a skewed workload with
+occasional updates. Needs a local MySQL or MariaDB server with the
+users table and 9-user_changes.sql, and a local redis-server.
+
+Adds bench users to the users table: use a scratch database.
+Usage: ./bench_user_cache.py user password database [lookups] [users]
+"""
+import itertools
+import random
+import sys
+import time
+import MySQLdb
+from users_dao import insert_users
+from user_cache import UserCache
+
+
+def questions(db):
+    """ Statements run by this session so far """
+    cursor = db.cursor()
+    cursor.execute("SHOW SESSION STATUS LIKE 'Questions'")
+    count = int(cursor.fetchone()[1])
+    cursor.close()
+    return count
+
+
+def run(label, db, workload, lookup, update):
+    """ Look up every id of `workload`, updating a user every 1000 """
+    before = questions(db)
+    latencies = []
+    for i, user_id in enumerate(workload):
+        if i % 1000 == 999:
+            update(user_id)
+        start = time.perf_counter()
+        lookup(user_id)
+        latencies.append(time.perf_counter() - start)
+    # Do not count the SHOW STATUS statements themselves
+    queries = questions(db) - before - 1
+    latencies.sort()
+    print("{:<10} {:>8} lookups {:>8} queries p50 {:>8.1f}us "
+          "p99 {:>8.1f}us".format(
+              label, len(workload), queries,
+              latencies[len(latencies) // 2] * 1e6,
+              latencies[int(len(latencies) * 0.99)] * 1e6))
+
+
+if __name__ == "__main__":
+    lookups = int(sys.argv[4]) if len(sys.argv) > 4 else 100000
+    count = int(sys.argv[5]) if len(sys.argv) > 5 else 10000
+    db = MySQLdb.connect(user=sys.argv[1], passwd=sys.argv[2],
+                         db=sys.argv[3], host='localhost')
+    insert_users(db, (("cache{}@bench.com".format(i), "User {}".format(i))
+                      for i in range(count)))
+    cursor = db.cursor()
+    cursor.execute("SELECT id FROM users WHERE email LIKE '%@bench.com'")
+    ids = [row[0] for row in cursor.fetchall()]
+    db.commit()
+
+    weights = itertools.accumulate(1 / rank for rank in range(1, len(ids) + 1))
+    workload = random.choices(ids, cum_weights=list(weights), k=lookups)
+
+    def select(user_id):
+        cursor.execute("SELECT id, email, name FROM users WHERE id = %s",
+                       (user_id,))
+        row = cursor.fetchone()
+        db.commit()
+        return row
+
+    def update(user_id):
+        cursor.execute("UPDATE users SET name = %s WHERE id = %s",
+                       ("Renamed {}".format(time.time()), user_id))
+        db.commit()
+
+    run("mysql", db, workload, select, update)
+
+    users = UserCache(db)
+
+    def update_and_poll(user_id):
+        update(user_id)
+        users.poll_changes()
+
+    run("usercache", db, workload, users.get_by_id, update_and_poll)
+    db.close()
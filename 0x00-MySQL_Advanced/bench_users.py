@@ -0,0 +1,69 @@
+#!/usr/bin/python3
+"""
+Compare row-by-row and batched user inserts, and buffered and
+streaming reads, on a copy of the users table of a local MySQL or
+MariaDB server.
+
+Usage: ./bench_users.py user password database [rows]
+"""
+import sys
+import time
+import MySQLdb
+from users_dao import insert_users, iter_users
+
+TABLE = "users_bench"
+
+
+def report(label, rows, elapsed):
+    """ Print the rows/sec of a run """
+    print("{:<26} {:>9} rows {:>8.2f}s {:>10.0f} rows/sec".format(
+        label, rows, elapsed, rows / elapsed))
+
+
+def users(count, start=0):
+    """ Generate (email, name) pairs """
+    for i in range(start, start + count):
+        yield ("bench{}@test.com".format(i), "Bench {}".format(i))
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[4]) if len(sys.argv) > 4 else 100000
+    db = MySQLdb.connect(user=sys.argv[1], passwd=sys.argv[2],
+                         db=sys.argv[3], host='localhost')
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE IF EXISTS {}".format(TABLE))
+    cursor.execute("CREATE TABLE {} LIKE users".format(TABLE))
+
+    # The old path, one INSERT and one commit per row, on a sample
+    sample = min(rows, 5000)
+    start = time.perf_counter()
+    for email, name in users(sample):
+        cursor.execute("INSERT INTO {} (email, name) VALUES (%s, %s)"
+                       .format(TABLE), (email, name))
+        db.commit()
+    report("row by row", sample, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    result = insert_users(db, users(rows, sample), batch_size=1000,
+                          commit_every=10, table=TABLE)
+    report("insert_users", result["rows"], time.perf_counter() - start)
+
+    start = time.perf_counter()
+    result = insert_users(db, users(rows, sample), table=TABLE)
+    report("insert_users (all dups)", result["rows"],
+           time.perf_counter() - start)
+
+    start = time.perf_counter()
+    dict_cursor = db.cursor(MySQLdb.cursors.DictCursor)
+    dict_cursor.execute("SELECT id, email, name FROM {}".format(TABLE))
+    count = len([{'id': i['id'], 'email': i['email'], 'name': i['name']}
+                 for i in dict_cursor.fetchall()])
+    dict_cursor.close()
+    report("fetchall + copy", count, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_users(db, table=TABLE))
+    report("iter_users", count, time.perf_counter() - start)
+
+    cursor.execute("DROP TABLE {}".format(TABLE))
+    db.close()
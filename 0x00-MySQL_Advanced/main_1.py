@@ -4,6 +4,7 @@ Main
 """
 import MySQLdb
 import sys
+from users_dao import insert_users, iter_users
 
 username = sys.argv[1]
 pwd = sys.argv[2]
@@ -12,25 +13,15 @@ db_name = sys.argv[3]
 
 db = MySQLdb.connect(user=username, passwd=pwd, db=db_name, host='localhost')
 
-cursor = db.cursor(MySQLdb.cursors.DictCursor)
-
 
 def listOfUsers():
     """ List all users.id """
-    cursor.execute('SELECT id, email, name FROM users;')
-    rows = cursor.fetchall()
-    return [{'id': i['id'], 'email': i['email'], 'name': i['name']} for i in rows]
+    return list(iter_users(db))
 
 def createUser(email, name):
     """ Create a user """
-    try:
-        if email is None:
-            cursor.execute('INSERT INTO users (name) VALUES ("{}")'.format(name))
-        else:
-            cursor.execute('INSERT INTO users (email, name) VALUES ("{}", "{}")'.format(email, name))
-        db.commit()
-    except:
-        pass
+    # Rows without an email are rejected, duplicated emails are ignored
+    insert_users(db, [(email, name)])
 
 
 # No user
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""
+batched order ingestion through the IngestStagedOrders procedure
+of 8-batch_orders.sql
+"""
+import MySQLdb
+
+
+def ingest_orders(db, orders, batch_size=10000):
+    """
+    Add (item_name, number) orders, `batch_size` at a time: each batch
+    is staged in a temporary table with one multi-row INSERT, then
+    applied by IngestStagedOrders in a single transaction.
+
+    Args:
+        db: An open MySQLdb connection.
+        orders: An iterable of (item_name, number) pairs.
+        batch_size (int): Orders per transaction.
+
+    Returns:
+        int: The number of orders added.
+
+    Raises:
+        MySQLdb.Error: After the failed batch was rolled back. Batches
+        applied before it are kept.
+    """
+    cursor = db.cursor()
+    added = 0
+    batch = []
+
+    def apply():
+        cursor.executemany("INSERT INTO orders_staging (item_name, number) "
+                           "VALUES (%s, %s)", batch)
+        cursor.execute("CALL IngestStagedOrders()")
+        batch.clear()
+
+    try:
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS orders_staging "
+                       "LIKE orders")
+        cursor.execute("DELETE FROM orders_staging")
+        for order in orders:
+            batch.append(order)
+            if len(batch) >= batch_size:
+                added += len(batch)
+                apply()
+        if batch:
+            added += len(batch)
+            apply()
+    except MySQLdb.Error:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    return added
@@ -0,0 +1,243 @@
+#!/usr/bin/python3
+"""
+read-through Redis cache of the users table, built on the Cache of
+0x02-redis_basic and invalidated from the user_changes log written by
+the triggers of 9-user_changes.sql
+"""
+import json
+import os
+import sys
+import time
+import MySQLdb
+import MySQLdb.cursors
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "0x02-redis_basic"))
+from exercise import Cache  # noqa: E402
+
+# Cached answer for a user that does not exist
+MISSING = "null"
+
+# Key of the last log entry applied to the cache, for the next process
+CURSOR = "changes:seq"
+
+
+class UserCache:
+    """
+    Cache-aside lookups of users by id and by email.
+
+    Hits are served from Redis; the misses of a batch are read with one
+    SELECT ... WHERE ... IN (...) and cached, users that do not exist
+    included (for `negative_ttl` seconds). Entries are deleted when the
+    user_changes log shows their user changed. The log is polled every
+    `poll_interval` seconds from the lookups, and right after every
+    fill, so a value read before a change committed never outlives the
+    next poll. Call `poll_changes` after committing writes to users to
+    invalidate them at once.
+
+    The cache is shared, not coherent: a change is invalidated for
+    every process by the first poll that sees it. Until then, up to
+    `poll_interval` seconds after a write not followed by
+    `poll_changes`, readers may still be served the previous value.
+
+    The last log entry applied is saved in Redis, next to the entries,
+    and a new UserCache resumes from it, so entries cached by earlier
+    processes are invalidated for the changes made while none was
+    polling. Without a usable cursor the namespace is cleared.
+
+    Emails are compared lowercased, like the default case-insensitive
+    collations do.
+    """
+
+    def __init__(self, db, cache: Cache = None, ttl: int = 300,
+                 negative_ttl: int = 30, poll_interval: float = 1.0,
+                 columns=("id", "email", "name"), table: str = "users",
+                 batch_size: int = 1000, gap_timeout: float = 30.0):
+        """
+        Args:
+            db: An open MySQLdb connection, used by this cache only.
+            cache (Cache, optional): Defaults to a Cache of the "users"
+            namespace.
+            ttl (int): Lifetime of cached users, in seconds.
+            negative_ttl (int): Lifetime of cached misses, in seconds.
+            poll_interval (float): Seconds between polls of the log.
+            columns (tuple): The columns cached for each user.
+            table (str): The users table.
+            batch_size (int): Ids or emails per SELECT, log rows per poll.
+            gap_timeout (float): How long a hole in the log sequence is
+            waited for: a transaction still running when a later one
+            committed, or a rolled back one.
+        """
+        if "id" not in columns or "email" not in columns:
+            raise ValueError("columns must include id and email")
+        self._db = db
+        self._cache = cache if cache is not None else Cache(namespace="users")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.poll_interval = poll_interval
+        self.columns = tuple(columns)
+        self.table = table
+        self.batch_size = batch_size
+        self.gap_timeout = gap_timeout
+        self.queries = 0
+        self._gaps = {}
+        self._last_poll = time.monotonic()
+
+        cursor = db.cursor()
+        cursor.execute("SELECT IFNULL(MIN(seq), 0), IFNULL(MAX(seq), 0) "
+                       "FROM user_changes")
+        first, last = cursor.fetchone()
+        cursor.close()
+        db.commit()
+
+        saved = self._cache.get(CURSOR, int)
+        if saved is None or saved > last or saved < first - 1:
+            # No cursor, or entries after it were pruned (or the log was
+            # recreated): what earlier processes cached cannot be
+            # checked, drop it. Changes up to now are in MySQL.
+            self._cache.clear()
+            self._last_seq = self._saved_seq = last
+            self._cache.set_many({CURSOR: last})
+        else:
+            # Apply the changes made since the cursor was saved
+            self._last_seq = self._saved_seq = saved
+            self.poll_changes()
+
+    def get_by_id(self, user_id: int):
+        """Return the user with this id as a dict, or None."""
+        return self.get_many_by_id([user_id])[0]
+
+    def get_by_email(self, email: str):
+        """Return the user with this email as a dict, or None."""
+        return self.get_many_by_email([email])[0]
+
+    def get_many_by_id(self, ids) -> list:
+        """Return the users (or None) of `ids`, in order."""
+        return self._lookup("id", list(ids), lambda user_id: user_id)
+
+    def get_many_by_email(self, emails) -> list:
+        """Return the users (or None) of `emails`, in order."""
+        return self._lookup("email", list(emails), str.lower)
+
+    def invalidate(self, ids=(), emails=()) -> None:
+        """Delete the cached entries of these ids and emails."""
+        keys = ["id:{}".format(user_id) for user_id in ids]
+        keys.extend("email:{}".format(email.lower())
+                    for email in emails if email is not None)
+        self._cache.delete(*keys)
+
+    def poll_changes(self) -> int:
+        """
+        Invalidate the users changed since the last poll.
+
+        Returns:
+            int: The number of log entries applied.
+        """
+        self._last_poll = time.monotonic()
+        applied = 0
+        cursor = self._db.cursor()
+        try:
+            while True:
+                query = ("SELECT seq, user_id, old_email, new_email "
+                         "FROM user_changes WHERE seq > %s")
+                args = [self._last_seq]
+                if self._gaps:
+                    query += " OR seq IN ({})".format(
+                        ", ".join(["%s"] * len(self._gaps)))
+                    args.extend(self._gaps)
+                cursor.execute(query + " ORDER BY seq LIMIT %s",
+                               args + [self.batch_size])
+                self.queries += 1
+                rows = cursor.fetchall()
+
+                ids, emails = set(), set()
+                now = time.monotonic()
+                # Advance on copies: if the invalidation fails, the next
+                # poll reads these entries again
+                last_seq, gaps = self._last_seq, dict(self._gaps)
+                for seq, user_id, old_email, new_email in rows:
+                    if gaps.pop(seq, None) is None:
+                        # Entries between the last one and this one may
+                        # still be committed later (the most recent ones)
+                        first = max(last_seq + 1, seq - self.batch_size)
+                        for missing in range(first, seq):
+                            gaps[missing] = now
+                        last_seq = max(last_seq, seq)
+                    ids.add(user_id)
+                    emails.update((old_email, new_email))
+                self.invalidate(ids, emails)
+                self._last_seq, self._gaps = last_seq, gaps
+                applied += len(rows)
+                if len(rows) < self.batch_size:
+                    break
+        finally:
+            cursor.close()
+            # End the snapshot so the next poll sees new commits
+            self._db.commit()
+
+        expired = time.monotonic() - self.gap_timeout
+        self._gaps = {seq: seen for seq, seen in self._gaps.items()
+                      if seen > expired}
+
+        # Save what is applied for sure: entries before the oldest hole
+        done = min(self._gaps) - 1 if self._gaps else self._last_seq
+        if done != self._saved_seq:
+            self._cache.set_many({CURSOR: done})
+            self._saved_seq = done
+        return applied
+
+    def _lookup(self, column: str, values: list, normalize) -> list:
+        """Serve `values` of `column` from Redis, filling the misses"""
+        if time.monotonic() - self._last_poll >= self.poll_interval:
+            self.poll_changes()
+
+        keys = ["{}:{}".format(column, normalize(value)) for value in values]
+        found = {}
+        missing = []
+        for value, key, data in zip(values, keys, self._cache.get_many(keys)):
+            if data is None:
+                missing.append(value)
+            else:
+                found[key] = json.loads(data)
+
+        if missing:
+            found.update(self._fill(column, missing, normalize))
+        return [found.get(key) for key in keys]
+
+    def _fill(self, column: str, values: list, normalize) -> dict:
+        """
+        Read users from MySQL, batch_size values per SELECT, and cache
+        them by id and by email, and the values not found as missing.
+        """
+        unique = list(dict.fromkeys(values))
+        found = {}
+        cursor = self._db.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            for i in range(0, len(unique), self.batch_size):
+                chunk = unique[i:i + self.batch_size]
+                cursor.execute("SELECT {} FROM `{}` WHERE {} IN ({})".format(
+                    ", ".join(self.columns), self.table, column,
+                    ", ".join(["%s"] * len(chunk))), chunk)
+                self.queries += 1
+                for row in cursor.fetchall():
+                    row = dict(row)
+                    found["id:{}".format(row["id"])] = row
+                    if row["email"] is not None:
+                        found["email:{}".format(row["email"].lower())] = row
+        finally:
+            cursor.close()
+            self._db.commit()
+
+        self._cache.set_many({key: json.dumps(row)
+                              for key, row in found.items()}, ttl=self.ttl)
+        negative = {}
+        for value in unique:
+            key = "{}:{}".format(column, normalize(value))
+            if key not in found:
+                negative[key] = MISSING
+                found[key] = None
+        self._cache.set_many(negative, ttl=self.negative_ttl)
+
+        # Drop what changed while we were reading
+        self.poll_changes()
+        return found
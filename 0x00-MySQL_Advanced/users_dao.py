@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+"""
+data access helpers for the users table: batched, parameterized
+inserts and streaming reads
+"""
+import MySQLdb
+import MySQLdb.cursors
+
+# What to do with a row whose email already exists
+ON_DUPLICATE = {
+    # keep the existing row
+    "ignore": " ON DUPLICATE KEY UPDATE id = id",
+    # overwrite the name of the existing row
+    "update": " ON DUPLICATE KEY UPDATE name = VALUES(name)",
+    # raise MySQLdb.IntegrityError
+    "error": "",
+}
+
+
+def insert_users(db, users, batch_size=1000, commit_every=1,
+                 on_duplicate="ignore", table="users"):
+    """
+    Insert (email, name) pairs with one multi-row INSERT per batch.
+
+    Duplicates are handled row by row with ON DUPLICATE KEY UPDATE
+    rather than INSERT IGNORE, so other errors (a too long value, a
+    missing table...) are still raised. Rows without an email are
+    rejected before reaching the server.
+
+    Args:
+        db: An open MySQLdb connection.
+        users: An iterable of (email, name) pairs.
+        batch_size (int): Rows sent per INSERT.
+        commit_every (int): Batches per transaction.
+        on_duplicate (str): "ignore", "update" or "error", see
+        ON_DUPLICATE.
+        table (str): The table to insert into.
+
+    Returns:
+        dict: "rows" sent, "affected" rows as reported by the server
+        (1 per inserted row, 2 per updated one, 0 per ignored one)
+        and the "rejected" pairs.
+
+    Raises:
+        MySQLdb.Error: After rolling back the uncommitted batches.
+        Batches committed before the error are kept.
+    """
+    if on_duplicate not in ON_DUPLICATE:
+        raise ValueError("on_duplicate must be one of {}".format(
+            ", ".join(ON_DUPLICATE)))
+    query = "INSERT INTO `{}` (email, name) VALUES (%s, %s){}".format(
+        table, ON_DUPLICATE[on_duplicate])
+
+    result = {"rows": 0, "affected": 0, "rejected": []}
+    cursor = db.cursor()
+    batch = []
+    pending = 0
+
+    def send():
+        # executemany rewrites the statement into one multi-row INSERT
+        cursor.executemany(query, batch)
+        result["rows"] += len(batch)
+        result["affected"] += cursor.rowcount
+        batch.clear()
+
+    try:
+        for email, name in users:
+            if email is None:
+                result["rejected"].append((email, name))
+                continue
+            batch.append((email, name))
+            if len(batch) >= batch_size:
+                send()
+                pending += 1
+                if pending >= commit_every:
+                    db.commit()
+                    pending = 0
+        if batch:
+            send()
+        db.commit()
+    except MySQLdb.Error:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+    return result
+
+
+def iter_users(db, fetch_size=1000, table="users"):
+    """
+    Stream the users with a server-side cursor, `fetch_size` rows at a
+    time, so memory does not grow with the table.
+
+    The connection cannot run other queries until the generator is
+    exhausted or closed.
+
+    Yields:
+        dict: A row with its id, email and name.
+    """
+    cursor = db.cursor(MySQLdb.cursors.SSDictCursor)
+    try:
+        cursor.execute("SELECT id, email, name FROM `{}`".format(table))
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cursor.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Compare payload size and encode/decode throughput of TypedCodec
+with the str-based path redis-py uses when Cache has no serializer.
+
+Needs no redis-server. Usage: ./bench_codec.py [rounds]
+"""
+import random
+import sys
+import time
+
+TypedCodec = __import__('codec').TypedCodec
+
+SAMPLES = {
+    "small int": 42,
+    "large int": 2 ** 60 + 12345,
+    "float": 3.141592653589793,
+    "short str": "hello world",
+    "4KB text": "lorem ipsum dolor sit amet " * 152,
+    "64KB bytes": bytes(random.getrandbits(8) for _ in range(65536)),
+}
+
+
+def str_dumps(value) -> bytes:
+    """What redis-py sends for a value"""
+    if isinstance(value, bytes):
+        return value
+    return repr(value).encode() if isinstance(value, float) \
+        else str(value).encode()
+
+
+def str_loads(data: bytes, kind: type):
+    """What a caller of get_int/get_str or a custom fn does on a read"""
+    if kind is bytes:
+        return data
+    return kind(data.decode("utf-8"))
+
+
+def throughput(fn, rounds: int) -> float:
+    """Calls of `fn` per second"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return rounds / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    codecs = [("typed", TypedCodec()),
+              ("typed+zlib", TypedCodec(compress_threshold=256))]
+    print("{:<11} {:<11} {:>8} {:>12} {:>12}".format(
+        "value", "path", "bytes", "enc/s", "dec/s"))
+    for name, value in SAMPLES.items():
+        n = max(1, rounds // (1 + len(str_dumps(value)) // 1024))
+        raw = str_dumps(value)
+        print("{:<11} {:<11} {:>8} {:>12.0f} {:>12.0f}".format(
+            name, "str", len(raw),
+            throughput(lambda: str_dumps(value), n),
+            throughput(lambda: str_loads(raw, type(value)), n)))
+        for label, codec in codecs:
+            data = codec.dumps(value)
+            assert codec.loads(data) == value
+            print("{:<11} {:<11} {:>8} {:>12.0f} {:>12.0f}".format(
+                name, label, len(data),
+                throughput(lambda: codec.dumps(value), n),
+                throughput(lambda: codec.loads(data), n)))
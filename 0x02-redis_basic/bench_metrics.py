@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Measure the overhead of count_calls metrics against the round trip
+to a local redis-server (localhost:6379).
+
+Usage: ./bench_metrics.py [calls]
+"""
+import sys
+import time
+import redis
+
+exercise = __import__('exercise')
+Cache = exercise.Cache
+CallMetrics = exercise.CallMetrics
+
+
+def per_call_ns(fn, n: int) -> float:
+    """Mean duration of `fn()` in nanoseconds"""
+    start = time.perf_counter_ns()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter_ns() - start) / n
+
+
+def instrumentation(metrics: CallMetrics) -> None:
+    """What the metrics path of count_calls adds to a call"""
+    start = time.perf_counter_ns()
+    metrics.record("bench", time.perf_counter_ns() - start,
+                   exercise._payload_size(("payload",)))
+    metrics.tick()
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    client = redis.Redis()
+
+    rtt = per_call_ns(client.ping, n)
+    metrics = CallMetrics(client, float("inf"), background=False)
+    overhead = per_call_ns(lambda: instrumentation(metrics), n)
+    metrics.close()
+    client.delete("bench:metrics", "bench:latency", "bench:size")
+    print("redis round trip   {:>8.0f} ns".format(rtt))
+    print("metrics overhead   {:>8.0f} ns ({:.1%} of a round trip)".format(
+        overhead, overhead / rtt))
+
+    for enabled in (False, True):
+        cache = Cache(redis_client=client, metrics=enabled)
+        cost = per_call_ns(lambda: cache.store("payload"), n)
+        cache.close()
+        print("store, metrics={:<5} {:>8.0f} ns/call".format(
+            str(enabled), cost))
+    exercise.report(cache.store)
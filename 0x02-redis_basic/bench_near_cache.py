@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark Cache.get with and without a near cache on a skewed
+(Zipfian) read workload against a local redis-server (localhost:6379).
+
+Usage: ./bench_near_cache.py [reads] [keys] [zipf_exponent]
+"""
+import itertools
+import random
+import sys
+import time
+
+Cache = __import__('exercise').Cache
+NearCache = __import__('near_cache').NearCache
+
+
+def zipf_sample(keys: list, n: int, s: float) -> list:
+    """Draw `n` keys where the k-th key has weight 1 / k**s"""
+    weights = [1 / (rank ** s) for rank in range(1, len(keys) + 1)]
+    cum_weights = list(itertools.accumulate(weights))
+    return random.choices(keys, cum_weights=cum_weights, k=n)
+
+
+def percentile(latencies: list, p: float) -> float:
+    """Return the p-th percentile of sorted `latencies`, in microseconds"""
+    return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6
+
+
+def run(label: str, cache: Cache, workload: list) -> None:
+    """Read every key of `workload` and print latency figures"""
+    latencies = []
+    start = time.perf_counter()
+    for key in workload:
+        t0 = time.perf_counter()
+        cache.get(key)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    print("{:<10} {:>10.0f} reads/sec p50 {:>7.1f}us p99 {:>7.1f}us".format(
+        label, len(workload) / elapsed,
+        percentile(latencies, 0.50), percentile(latencies, 0.99)))
+
+
+if __name__ == "__main__":
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    nkeys = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    exponent = float(sys.argv[3]) if len(sys.argv) > 3 else 1.1
+
+    plain = Cache()
+    keys = plain.store_many("value-{}".format(i) for i in range(nkeys))
+    workload = zipf_sample(keys, reads, exponent)
+
+    run("redis", plain, workload)
+
+    near = NearCache(max_entries=nkeys // 10, ttl=30)
+    cached = Cache(near_cache=near)
+    run("near", cached, workload)
+    print(near.stats())
+    cached.close()
+    plain.clear()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark Cache.store with and without buffered instrumentation.
+
+Counts the network round trips made by the client and the resulting
+ops/sec against a local redis-server (localhost:6379).
+
+Usage: ./bench_pipeline.py [number_of_stores]
+"""
+import sys
+import time
+import redis
+
+exercise = __import__('exercise')
+Cache = exercise.Cache
+replay = exercise.replay
+
+
+class CountingConnection(redis.Connection):
+    """A connection that counts every packet sent to the server"""
+    round_trips = 0
+
+    def send_packed_command(self, command, check_health=True):
+        """Count one round trip per packed command sent"""
+        CountingConnection.round_trips += 1
+        return super().send_packed_command(command, check_health)
+
+
+def run(n: int, batch: int = 0, **options) -> None:
+    """Store `n` values with the given Cache options and print stats"""
+    pool = redis.ConnectionPool(connection_class=CountingConnection)
+    cache = Cache(redis_client=redis.Redis(connection_pool=pool), **options)
+    # Start every run from an empty count and history
+    cache._redis.delete(Cache.store.__qualname__,
+                        Cache.store.__qualname__ + ":history")
+    cache.clear()
+
+    CountingConnection.round_trips = 0
+    start = time.perf_counter()
+    if batch:
+        cache.store_many(range(n), chunk_size=batch)
+    else:
+        for i in range(n):
+            cache.store(i)
+    cache.close()
+    elapsed = time.perf_counter() - start
+
+    calls = int(cache._redis.get(Cache.store.__qualname__) or 0)
+    label = "buffered" if options.get("buffered") else "unbuffered"
+    if batch:
+        label = "store_many"
+    print("{:<11} {:>8} stores {:>8} round trips {:>10.0f} ops/sec "
+          "(count={})".format(label, n, CountingConnection.round_trips,
+                              n / elapsed, calls))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    run(n)
+    run(n, buffered=True, flush_size=400)
+    run(n, buffered=True, flush_size=10 ** 9, flush_interval=0.05,
+        background_flush=True)
+    run(n, batch=1000)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Compare warming the page cache for many URLs with web.get_page (one at
+a time) and web_async.get_pages against a local delayed HTTP stub.
+
+Needs a local redis-server.
+Usage: ./bench_web_async.py [urls] [concurrency] [delay]
+"""
+import asyncio
+import sys
+import time
+
+web = __import__('web')
+web_async = __import__('web_async')
+stub_server = __import__('stub_server')
+
+
+def report(label: str, count: int, elapsed: float) -> None:
+    """Print the throughput of a run"""
+    print("{:<22} {:>6} pages {:>8.2f}s {:>10.1f} pages/sec".format(
+        label, count, elapsed, count / elapsed))
+
+
+def forget(urls: list) -> None:
+    """Drop the cached copies of `urls`"""
+    web.redis_client.delete(*["cached:" + url for url in urls])
+
+
+async def async_runs(urls: list, concurrency: int) -> None:
+    """Time a cold then a warm get_pages, in one event loop"""
+    for label in ("get_pages (cold)", "get_pages (warm)"):
+        start = time.perf_counter()
+        await web_async.get_pages(urls, concurrency=concurrency)
+        report(label, len(urls), time.perf_counter() - start)
+    await web_async.close()
+    await web_async.redis_client.aclose()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.05
+    server = stub_server.start(delay=delay)
+    urls = [stub_server.url(server, "/page/{}".format(i))
+            for i in range(count)]
+
+    forget(urls)
+    start = time.perf_counter()
+    for url in urls:
+        web.get_page(url)
+    report("get_page (sequential)", count, time.perf_counter() - start)
+
+    forget(urls)
+    asyncio.run(async_runs(urls, concurrency))
+    server.shutdown()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Count upstream fetches when N callers ask for the same expired page,
+with and without single-flight and stale-while-revalidate.
+
+Needs a local redis-server. Usage: ./bench_web_stampede.py [callers]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+web = __import__('web')
+stub_server = __import__('stub_server')
+DelayedHandler = stub_server.DelayedHandler
+
+
+def fetch(url: str) -> str:
+    """Fetch a page from the stub server"""
+    return requests.get(url).text
+
+
+def storm(label: str, get_page, url: str, callers: int,
+          expire: bool = True) -> int:
+    """
+    Call `get_page(url)` from `callers` threads at once.
+
+    Returns:
+        int: The number of upstream fetches made during the storm.
+    """
+    if expire:
+        web.redis_client.delete("cached:" + url, "fresh:" + url)
+    DelayedHandler.fetches = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(callers) as pool:
+        pages = list(pool.map(get_page, [url] * callers))
+    elapsed = time.perf_counter() - start
+    assert all(pages)
+    print("{:<24} {:>3} callers {:>3} upstream fetches {:>6.2f}s".format(
+        label, callers, DelayedHandler.fetches, elapsed))
+    return DelayedHandler.fetches
+
+
+if __name__ == "__main__":
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    server = stub_server.start(delay=0.5)
+
+    url = stub_server.url(server, "/plain")
+    storm("plain miss", web.url_access_count(fetch), url, callers)
+
+    url = stub_server.url(server, "/single-flight")
+    fetches = storm("single-flight miss",
+                    web.url_access_count(fetch, single_flight=True), url,
+                    callers)
+    assert fetches == 1, fetches
+
+    url = stub_server.url(server, "/swr")
+    swr = web.url_access_count(fetch, single_flight=True, soft_ttl=1,
+                               hard_ttl=30)
+    assert storm("single-flight miss", swr, url, callers) == 1
+    time.sleep(1.2)
+    storm("stale-while-revalidate", swr, url, callers, expire=False)
+    # The refresh runs in the background: let it finish
+    time.sleep(1)
+    print("background refreshes: {}".format(DelayedHandler.fetches))
+    assert DelayedHandler.fetches == 1, DelayedHandler.fetches
+
+    # Followers keep waiting while the lease is held, however slow
+    # the upstream is
+    url = stub_server.url(server, "/slow")
+    DelayedHandler.delay = 2
+    fetches = storm("single-flight slow miss",
+                    web.url_access_count(fetch, single_flight=True), url,
+                    callers)
+    assert fetches == 1, fetches
+    server.shutdown()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+serializers turning Cache values into bytes and back
+"""
+import struct
+from abc import ABC, abstractmethod
+import zlib
+from typing import Union
+
+# One-byte type tags; the high bit flags a zlib-compressed payload
+BYTES = 0x01
+STR = 0x02
+INT = 0x03
+BIGINT = 0x04
+FLOAT = 0x05
+COMPRESSED = 0x80
+
+_INT = struct.Struct(">Bq")
+_FLOAT = struct.Struct(">Bd")
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+
+
+class Serializer(ABC):
+    """
+    Interface of the serializers accepted by `Cache`
+    """
+
+    @abstractmethod
+    def dumps(self, value) -> bytes:
+        """Encode `value` into the bytes stored in Redis"""
+
+    @abstractmethod
+    def loads(self, data: bytes):
+        """Decode bytes read from Redis back into a value"""
+
+
+class TypedCodec(Serializer):
+    """
+    A compact, type-tagged binary encoding for str, bytes, int and
+    float values.
+
+    Every payload starts with a one-byte tag. Ints fitting in 64 bits
+    and floats are packed with `struct` (9 bytes), larger ints are
+    stored as two's-complement bytes. str and bytes payloads of at
+    least `compress_threshold` bytes are zlib-compressed when that
+    makes them smaller.
+
+    Decoded bytes are returned as a `memoryview` over the data read
+    from Redis, so they are not copied.
+    """
+
+    def __init__(self, compress_threshold: Union[int, None] = None,
+                 compress_level: int = 1):
+        """
+        Args:
+            compress_threshold (int, optional): Minimum payload size
+            to try compressing. Defaults to None (never compress).
+            compress_level (int): zlib compression level.
+        """
+        self.compress_threshold = compress_threshold
+        self.compress_level = compress_level
+
+    def dumps(self, value: Union[str, bytes, int, float]) -> bytes:
+        """
+        Encode `value` with its type tag.
+
+        Raises:
+            TypeError: If `value` is not a str, bytes, int or float.
+        """
+        if isinstance(value, int) and not isinstance(value, bool):
+            if _INT_MIN <= value <= _INT_MAX:
+                return _INT.pack(INT, value)
+            size = (value.bit_length() + 8) // 8
+            return bytes((BIGINT,)) + value.to_bytes(size, "big",
+                                                     signed=True)
+        if isinstance(value, float):
+            return _FLOAT.pack(FLOAT, value)
+        if isinstance(value, str):
+            tag, payload = STR, value.encode("utf-8")
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            tag, payload = BYTES, value
+        else:
+            raise TypeError("cannot encode {}".format(type(value).__name__))
+
+        if (self.compress_threshold is not None and
+                len(payload) >= self.compress_threshold):
+            compressed = zlib.compress(payload, self.compress_level)
+            if len(compressed) < len(payload):
+                return bytes((tag | COMPRESSED,)) + compressed
+        return bytes((tag,)) + payload
+
+    def loads(self, data: bytes) -> Union[str, memoryview, bytes, int,
+                                          float]:
+        """
+        Decode a payload of bytes produced by `dumps`.
+
+        Raises:
+            ValueError: If the payload has an unknown tag.
+        """
+        tag = data[0]
+        if tag == STR:
+            return data[1:].decode("utf-8")
+        if tag == BYTES:
+            return memoryview(data)[1:]
+        if tag == INT:
+            return _INT.unpack(data)[1]
+        if tag == FLOAT:
+            return _FLOAT.unpack(data)[1]
+        if tag == BIGINT:
+            return int.from_bytes(data[1:], "big", signed=True)
+        if tag == STR | COMPRESSED:
+            return zlib.decompress(memoryview(data)[1:]).decode("utf-8")
+        if tag == BYTES | COMPRESSED:
+            return zlib.decompress(memoryview(data)[1:])
+        raise ValueError("unknown type tag {:#04x}".format(tag))
@@ -2,16 +2,345 @@
 """
 creating a simple redis cache
 """
+import atexit
 import redis
+import sys
 import uuid
-from typing import Union, Callable
+import weakref
+from typing import (Union, Callable, Optional, Iterable, List, Mapping,
+                    Iterator, Tuple)
+from datetime import datetime
 import functools
+import itertools
+import math
+import threading
+import time
+from near_cache import NearCache
+from codec import Serializer
+
+# Approximate number of calls kept in each call history stream
+HISTORY_MAXLEN = 10000
+
+# Characters with a special meaning in SCAN MATCH patterns
+_GLOB_SPECIAL = str.maketrans({c: "\\" + c for c in "*?[]\\"})
+
+
+class InstrumentationBuffer:
+    """
+    Buffers the bookkeeping writes made by `count_calls` and
+    `call_history` (and the SETs issued by `Cache.store`) in process,
+    and sends them to Redis in a single MULTI/EXEC pipeline.
+
+    A flush happens when `flush_size` operations are pending, when
+    `flush_interval` seconds have passed since the previous flush, or
+    when `flush` is called explicitly. With `background` set, a daemon
+    thread also flushes every `flush_interval` seconds. A failed flush
+    keeps every write pending, and buffers still open when the
+    interpreter exits are flushed then.
+    """
+
+    def __init__(self, client: redis.Redis, flush_size: int = 100,
+                 flush_interval: Optional[float] = None,
+                 background: bool = False):
+        """
+        Args:
+            client (redis.Redis): The client used to execute pipelines.
+            flush_size (int): Pending operations that trigger a flush.
+            flush_interval (float, optional): Maximum seconds between
+            flushes. Defaults to None (flush by size only).
+            background (bool): Flush from a daemon thread every
+            `flush_interval` seconds.
+        """
+        if background and not flush_interval:
+            raise ValueError("background flushing needs a flush_interval")
+        self._client = client
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._entries = []
+        self._sets = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self.flushes = 0
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        _open_flushers.add(self)
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        """Queue an increment; increments of one key are coalesced."""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+            self._pending += 1
+
+    def xadd(self, name: str, fields: Mapping,
+             maxlen: Optional[int] = None) -> None:
+        """Queue an entry to append to the stream `name`."""
+        with self._lock:
+            self._entries.append((name, fields, maxlen))
+            self._pending += 1
+
+    def set(self, key: str, value) -> None:
+        """Queue a SET of `key` to `value`."""
+        with self._lock:
+            self._sets[key] = value
+            self._pending += 1
+
+    def mset(self, mapping: Mapping) -> None:
+        """Queue a SET for every key/value pair of `mapping`."""
+        with self._lock:
+            self._sets.update(mapping)
+            self._pending += len(mapping)
+
+    @property
+    def pending(self) -> int:
+        """Number of operations waiting to be flushed."""
+        return self._pending
+
+    def holds(self, keys: Iterable[str]) -> bool:
+        """Return True if a SET of one of `keys` is waiting to be flushed."""
+        with self._lock:
+            return any(key in self._sets for key in keys)
+
+    def tick(self) -> None:
+        """Flush if the size or time threshold has been reached."""
+        if self._pending >= self.flush_size:
+            self.flush()
+        elif (self.flush_interval is not None and self._pending and
+              time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Send every pending operation to Redis in one round trip.
+
+        Returns:
+            int: The number of operations flushed.
+        """
+        with self._lock:
+            flushed = self._pending
+            self._last_flush = time.monotonic()
+            if not flushed:
+                return 0
+
+            # Values first, then history, then counters, so a reader
+            # never sees a count for a value that does not exist yet
+            pipe = self._client.pipeline(transaction=True)
+            if self._sets:
+                pipe.mset(self._sets)
+            for name, fields, maxlen in self._entries:
+                pipe.xadd(name, fields, maxlen=maxlen, approximate=True)
+            for name, amount in self._counters.items():
+                pipe.incrby(name, amount)
+            pipe.execute()
+
+            # Only drop the writes once Redis has them: on an error they
+            # stay pending and the next flush sends them again
+            self._counters = {}
+            self._entries = []
+            self._sets = {}
+            self._pending = 0
+            self.flushes += 1
+        return flushed
+
+    def close(self) -> None:
+        """
+        Stop the background thread, if any, and flush what is left.
+
+        Raises:
+            redis.RedisError: If the last flush fails. The writes stay
+            pending, and `close` or `flush` can be called again.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        _open_flushers.discard(self)
+
+    def _run(self) -> None:
+        """Background loop flushing every `flush_interval` seconds."""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except redis.RedisError:
+                # Keep the thread alive; the writes are still pending
+                # and the next tick retries
+                continue
+
+
+# Buffers and metrics not closed yet, flushed when the interpreter exits
+_open_flushers = weakref.WeakSet()
+
+
+@atexit.register
+def _close_open_flushers() -> None:
+    """Flush what was left open, reporting the writes that are lost"""
+    for flusher in list(_open_flushers):
+        try:
+            flusher.close()
+        except redis.RedisError as error:
+            print("{}: unflushed writes lost: {}".format(
+                type(flusher).__name__, error), file=sys.stderr)
+
+
+class CallMetrics:
+    """
+    In-process latency, payload size and error aggregates per
+    qualified name, flushed to Redis hashes every `flush_interval`
+    seconds:
+
+    - `<name>:metrics`: calls, errors, total_ns, started and updated
+      (UNIX timestamps of the first call recorded and of the last
+      flush)
+    - `<name>:latency`: call count per latency bucket
+    - `<name>:size`: call count per payload size bucket
+
+    Bucket `b` holds values `v` with `v.bit_length() == b`, that is
+    `2 ** (b - 1) <= v < 2 ** b` (nanoseconds for latencies, bytes or
+    characters for sizes).
+
+    Calls flush from `tick` once the interval has passed, and what is
+    left is flushed by `close` or at exit: when traffic stops, the last
+    interval waits for one of these unless the background thread
+    (`start`) flushes every `flush_interval` seconds.
+
+    Caches share the instance of their server, see `shared`.
+    """
+
+    def __init__(self, client: redis.Redis, flush_interval: float = 5.0,
+                 background: bool = False):
+        """
+        Args:
+            client (redis.Redis): The client used to flush.
+            flush_interval (float): Seconds between flushes.
+            background (bool): Flush from a daemon thread every
+            `flush_interval` seconds.
+        """
+        self._client = client
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+        if background:
+            self.start()
+        _open_flushers.add(self)
+
+    @classmethod
+    def shared(cls, client: redis.Redis, flush_interval: float = 5.0,
+               background: bool = False) -> "CallMetrics":
+        """
+        Return the process-wide instance for the server of `client`,
+        created on first use with `flush_interval`, so short-lived
+        caches add no flusher of their own.
+
+        Args:
+            background (bool): Also start the background thread.
+        """
+        kwargs = client.connection_pool.connection_kwargs
+        server = tuple(kwargs.get(name) for name in
+                       ("host", "port", "path", "db", "username"))
+        with _shared_metrics_lock:
+            metrics = _shared_metrics.get(server)
+            if metrics is None:
+                metrics = _shared_metrics[server] = cls(client,
+                                                        flush_interval)
+            if background:
+                metrics.start()
+        return metrics
+
+    def start(self) -> None:
+        """Start the background thread, if not running."""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run,
+                                                daemon=True)
+                self._thread.start()
+
+    def record(self, name: str, elapsed_ns: int,
+               size: Optional[int] = None, error: bool = False) -> None:
+        """Aggregate one call of `name`."""
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                # The window of these aggregates starts with this call
+                stats = self._stats[name] = [0, 0, 0, {}, {}, time.time()]
+            stats[0] += 1
+            stats[2] += elapsed_ns
+            if error:
+                stats[1] += 1
+            latency = stats[3]
+            bucket = elapsed_ns.bit_length()
+            latency[bucket] = latency.get(bucket, 0) + 1
+            if size is not None:
+                sizes = stats[4]
+                bucket = size.bit_length()
+                sizes[bucket] = sizes.get(bucket, 0) + 1
+
+    def tick(self) -> None:
+        """Flush if `flush_interval` seconds have passed."""
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """Add the aggregates to the Redis hashes and reset them."""
+        with self._lock:
+            stats, self._stats = self._stats, {}
+            self._last_flush = time.monotonic()
+        if not stats:
+            return
+        now = time.time()
+        pipe = self._client.pipeline(transaction=False)
+        for name, (calls, errors, total_ns, latency, sizes,
+                   started) in stats.items():
+            key = name + ":metrics"
+            pipe.hincrby(key, "calls", calls)
+            pipe.hincrby(key, "errors", errors)
+            pipe.hincrby(key, "total_ns", total_ns)
+            pipe.hsetnx(key, "started", started)
+            pipe.hset(key, "updated", now)
+            for field, hist in (("latency", latency), ("size", sizes)):
+                for bucket, count in hist.items():
+                    pipe.hincrby(name + ":" + field, bucket, count)
+        pipe.execute()
+
+    def close(self) -> None:
+        """Stop the background thread, if any, and flush what is left."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        _open_flushers.discard(self)
+
+    def _run(self) -> None:
+        """Background loop flushing every `flush_interval` seconds."""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except redis.RedisError:
+                continue
+
+
+# The CallMetrics shared by the caches of each server, see `shared`
+_shared_metrics = {}
+_shared_metrics_lock = threading.Lock()
 
 
 def count_calls(method: Callable) -> Callable:
     """
     Decorator to count the number of times a method is called.
 
+    When the instance has `CallMetrics` (`Cache(metrics=True)`), each
+    call is also timed and its latency, payload size and failure are
+    aggregated in process and flushed periodically, see `report`.
+
     Args:
         method (Callable): The method to be decorated.
 
@@ -37,6 +366,32 @@ def count_calls(method: Callable) -> Callable:
         Returns:
             Any: The result of calling the original method.
         """
+        metrics = getattr(self, "_metrics", None)
+        if metrics is None:
+            return counted(self, args, kwargs)
+
+        # Time the whole call, bookkeeping included
+        start = time.perf_counter_ns()
+        try:
+            result = counted(self, args, kwargs)
+        except Exception:
+            metrics.record(qual_name, time.perf_counter_ns() - start,
+                           _payload_size(args), error=True)
+            raise
+        metrics.record(qual_name, time.perf_counter_ns() - start,
+                       _payload_size(args))
+        metrics.tick()
+        return result
+
+    def counted(self, args, kwargs):
+        buffer = getattr(self, "_buffer", None)
+        if buffer is not None:
+            # Queue the increment and let the buffer decide when to flush
+            buffer.incr(qual_name)
+            result = method(self, *args, **kwargs)
+            buffer.tick()
+            return result
+
         # Increment the count associated with the method's qualified name
         self._redis.incr(qual_name)
 
@@ -46,23 +401,70 @@ def count_calls(method: Callable) -> Callable:
     return wrapper
 
 
+def _payload_size(args: tuple) -> Optional[int]:
+    """
+    Return the size of the first argument if it is a str or bytes-like
+    """
+    if args and isinstance(args[0], (str, bytes, bytearray, memoryview)):
+        return len(args[0])
+    return None
+
+
+def _as_str(value) -> str:
+    """
+    Convert a value decoded by a serializer to str, bytes as UTF-8
+    """
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).decode("utf-8")
+    return str(value)
+
+
+def _as_int(value) -> int:
+    """
+    Convert a value decoded by a serializer to int
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, memoryview):
+        value = bytes(value)
+    return int(value)
+
+
+def _history_key(qual_name: str) -> str:
+    """
+    Return the key of the stream holding the call history of a method
+    """
+    return qual_name + ":history"
+
+
 def call_history(method: Callable) -> Callable:
     """
     acts as a decorator, takes the decorated function and store
-    its inputs and outputs in lists our Redis Cache using rpush
+    its inputs and outputs in a capped Redis stream, one entry
+    per call holding both the input and the output.
+
+    The stream is trimmed to about `history_maxlen` entries of the
+    instance (HISTORY_MAXLEN by default).
     """
+    key = _history_key(method.__qualname__)
+
     # Define the wrapper function that will replace the original method
     @functools.wraps(method)
     def wrapper(self, *args, **kwargs):
-        # Push the method's input arguments as a string into the Redis list
-        input = str(args)
-        self._redis.rpush(method.__qualname__ + ":inputs", input)
-
         # Call the original method and capture its result
         result = method(self, *args, **kwargs)
 
-        # Push the result of the method into the Redis list for outputs
-        self._redis.rpush(method.__qualname__ + ":outputs", result)
+        # Write the input and the output as a single stream entry
+        fields = {"input": str(args), "output": result}
+        maxlen = getattr(self, "history_maxlen", HISTORY_MAXLEN)
+        buffer = getattr(self, "_buffer", None)
+        if buffer is not None:
+            buffer.xadd(key, fields, maxlen=maxlen)
+            buffer.tick()
+        else:
+            self._redis.xadd(key, fields, maxlen=maxlen, approximate=True)
 
         # Return the result obtained from calling the original method
         return result
@@ -71,66 +473,386 @@ def call_history(method: Callable) -> Callable:
     return wrapper
 
 
-def replay(method: Callable):
+def _chunks(iterable: Iterable, size: int):
+    """
+    Yield successive lists of at most `size` items from `iterable`
+    """
+    if size < 1:
+        raise ValueError("chunk_size must be at least 1")
+    iterator = iter(iterable)
+    chunk = list(itertools.islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(itertools.islice(iterator, size))
+
+
+def _stream_id(when: Union[float, datetime, None], default: str,
+               round_up: bool = False) -> str:
+    """
+    Convert a datetime or a UNIX timestamp into a stream ID bound, in
+    whole milliseconds rounded down, or up for a lower bound
+    """
+    if when is None:
+        return default
+    if isinstance(when, datetime):
+        when = when.timestamp()
+    if round_up:
+        return str(math.ceil(when * 1000))
+    return str(int(when * 1000))
+
+
+def _next_id(entry_id: bytes) -> str:
+    """
+    Return the smallest stream ID greater than `entry_id`
+    """
+    ms, seq = entry_id.decode("utf-8").split("-")
+    return "{}-{}".format(ms, int(seq) + 1)
+
+
+def _client_for(method: Callable) -> redis.Redis:
+    """
+    Return the client of the Cache a bound method belongs to, or a
+    default client
+    """
+    client = getattr(getattr(method, "__self__", None), "_redis", None)
+    return client if client is not None else redis.Redis()
+
+
+def iter_history(method: Callable,
+                 start: Union[float, datetime, None] = None,
+                 end: Union[float, datetime, None] = None,
+                 last: Optional[int] = None,
+                 page_size: int = 100,
+                 client: redis.Redis = None
+                 ) -> Iterator[Tuple[str, str, str]]:
+    """
+    Lazily iterate over the recorded calls of a method, oldest first,
+    fetching `page_size` entries per round trip.
+
+    Args:
+        method (Callable): The decorated method.
+        start, end (float | datetime, optional): Only yield calls made
+        within this time range (UNIX timestamps or datetimes).
+        last (int, optional): Only yield the `last` most recent calls
+        of the range.
+        page_size (int): Entries fetched per round trip.
+        client (redis.Redis, optional): The client to read with.
+
+    Yields:
+        Tuple[str, str, str]: The entry ID, the input and the output.
+    """
+    r = client if client is not None else _client_for(method)
+    key = _history_key(method.__qualname__)
+    low = _stream_id(start, "-", round_up=True)
+    high = _stream_id(end, "+")
+
+    if last is not None:
+        # Walk back from the end, keeping only the oldest ID seen, so
+        # memory stays bounded by the page size
+        remaining, cursor, oldest = last, high, None
+        while remaining > 0:
+            page = r.xrevrange(key, cursor, low,
+                               count=min(page_size, remaining))
+            if not page:
+                break
+            oldest = page[-1][0]
+            remaining -= len(page)
+            ms, seq = oldest.decode("utf-8").split("-")
+            if int(seq) > 0:
+                cursor = "{}-{}".format(ms, int(seq) - 1)
+            elif int(ms) > 0:
+                cursor = "{}-{}".format(int(ms) - 1, 2 ** 64 - 1)
+            else:
+                break
+        if oldest is None:
+            return
+        low = oldest.decode("utf-8")
+
+    while True:
+        page = r.xrange(key, low, high, count=page_size)
+        for entry_id, fields in page:
+            yield (entry_id.decode("utf-8"),
+                   fields.get(b"input", b"").decode("utf-8", "replace"),
+                   fields.get(b"output", b"").decode("utf-8", "replace"))
+        if len(page) < page_size:
+            return
+        low = _next_id(page[-1][0])
+
+
+def replay(method: Callable, start: Union[float, datetime, None] = None,
+           end: Union[float, datetime, None] = None,
+           last: Optional[int] = None, page_size: int = 100):
     """
     takes a callable and retrieves what is stored in the input
     and output history of the callable
-    """
-    # Generate a unique Redis key for the inputs based on the method's name
-    key = "{}".format(method.__qualname__ + ":inputs")
 
+    The history is streamed page by page, so memory stays constant
+    however long it is. `start`/`end` restrict it to a time range and
+    `last` to the most recent calls, see `iter_history`; the count
+    printed is then the number of calls shown.
+    """
     # Create a Redis client
-    r = redis.Redis()
+    r = _client_for(method)
 
-    # Get the length (number of items) in the Redis list associated with 'key'
-    length = r.llen(key)
+    if start is not None or end is not None or last is not None:
+        # Count the calls that will be shown, one page at a time
+        count = sum(1 for _ in iter_history(method, start, end, last,
+                                            page_size, r))
+    else:
+        # Prefer the count_calls counter: the history stream is capped
+        count = r.get(method.__qualname__)
+        if count is None:
+            count = r.xlen(_history_key(method.__qualname__))
 
     # Print the method's name and how many times it was called
-    print("{} was called {} times:".format(method.__qualname__, length))
-
-    # Retrieve the inputs and outputs stored in Redis lists
-    inputs = r.lrange("{}:inputs".format(method.__qualname__), 0, -1)
-    outputs = r.lrange("{}:outputs".format(method.__qualname__), 0, -1)
+    print("{} was called {} times:".format(
+        method.__qualname__, int(count)))
 
     # Iterate through the inputs and outputs, and display them
-    for inputs, outputs in zip(inputs, outputs):
-        try:
-            input = inputs.decode("utf-8")
-        except Exception:
-            input = ""
-        try:
-            output = outputs.decode("utf-8")
-        except Exception:
-            output = ""
-
+    for _, input, output in iter_history(method, start, end, last,
+                                         page_size, r):
         # Print the method's name, input, and corresponding output
         print("{}(*{}) -> {}".format(method.__qualname__, input, output))
 
 
+def _percentile(histogram: dict, fraction: float) -> float:
+    """
+    Estimate a percentile, in nanoseconds, from a bit_length histogram
+    (the geometric middle of the bucket holding it)
+    """
+    total = sum(histogram.values())
+    rank = fraction * total
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return 2 ** (bucket - 0.5) if bucket else 0.0
+    return 0.0
+
+
+def report(*methods: Union[Callable, str]):
+    """
+    takes callables (or qualified names) and prints the latency
+    percentiles, throughput and error rate flushed by `CallMetrics`
+    """
+    # Create a Redis client
+    r = _client_for(methods[0]) if methods else redis.Redis()
+
+    for method in methods:
+        name = getattr(method, "__qualname__", method)
+        metrics = r.hgetall(name + ":metrics")
+        if not metrics:
+            print("{}: no metrics".format(name))
+            continue
+        calls = int(metrics[b"calls"])
+        errors = int(metrics[b"errors"])
+        window = float(metrics[b"updated"]) - float(metrics[b"started"])
+        latency = {int(bucket): int(count) for bucket, count
+                   in r.hgetall(name + ":latency").items()}
+
+        # Print the percentiles in microseconds
+        print("{}: {} calls, {:.1f} calls/sec, {:.2%} errors, "
+              "mean {:.1f}us p50 {:.1f}us p95 {:.1f}us p99 {:.1f}us".format(
+                  name, calls, calls / window if window > 0 else 0.0,
+                  errors / calls if calls else 0.0,
+                  int(metrics[b"total_ns"]) / calls / 1000 if calls else 0.0,
+                  _percentile(latency, 0.50) / 1000,
+                  _percentile(latency, 0.95) / 1000,
+                  _percentile(latency, 0.99) / 1000))
+
+
 class Cache:
     """
     a class for a simple
     redis cache
     """
+    history_maxlen = HISTORY_MAXLEN
 
-    def __init__(self):
+    def __init__(self, redis_client: redis.Redis = None,
+                 buffered: bool = False, flush_size: int = 100,
+                 flush_interval: float = None,
+                 background_flush: bool = False,
+                 near_cache: NearCache = None,
+                 serializer: Serializer = None,
+                 namespace: str = "cache",
+                 generation_refresh: float = 1.0,
+                 reclaim_batch: int = 500,
+                 reclaim_rate: float = 10000,
+                 metrics: bool = False,
+                 metrics_interval: float = 5.0,
+                 metrics_background: bool = False):
         """
-        Initialize a Redis client and flush the Redis database.
+        Initialize a Redis client for a namespace of the database.
 
         This constructor method creates an instance of a Redis
-        client using the `redis.Redis()` constructor and also
-        defines a `flush` attribute, which is a reference to the
-        `flushdb` method of the Redis client instance. This allows
-        you to easily flush the Redis database when needed.
+        client using the `redis.Redis()` constructor. Constructing a
+        Cache is cheap and leaves existing keys alone: values live
+        under `<namespace>:<generation>:<key>`, and `clear` empties
+        the namespace by bumping its generation.
+
+        The `flush` attribute is still a reference to the `flushdb`
+        method of the Redis client, which wipes the whole database,
+        every namespace and the call counts and histories included.
+        Prefer `clear`. The `count_calls` and `call_history` keys
+        (`Cache.store`, `Cache.store:history`) are shared by every
+        Cache of the database and are not reset by `clear`.
 
         Parameters:
-            None
+            redis_client (redis.Redis, optional): Client to use instead
+            of a default `redis.Redis()`.
+            buffered (bool): Buffer the instrumentation writes and the
+            SET of `store` and send them in one pipeline. See
+            `InstrumentationBuffer`.
+            flush_size (int): Pending operations that trigger a flush.
+            flush_interval (float, optional): Maximum seconds between
+            flushes.
+            background_flush (bool): Flush from a background thread
+            every `flush_interval` seconds.
+            near_cache (NearCache, optional): An in-process cache
+            consulted by `get` and `get_many` before Redis. It is
+            attached to this client for the invalidation messages of the
+            keys of the namespace.
+            serializer (Serializer, optional): Encodes stored values
+            and decodes read ones, e.g. `codec.TypedCodec()`, so that
+            `get` returns the original type. Defaults to None, which
+            lets redis-py stringify values.
+            namespace (str): Prefix of every key of this cache. It
+            cannot contain ":", so that no namespace is nested in
+            another one and reclaimed with it.
+            generation_refresh (float): Seconds a generation number read
+            from Redis is trusted before being read again, which bounds
+            how long another process may see a cleared namespace.
+            reclaim_batch (int): Keys scanned and unlinked per batch when
+            reclaiming old generations.
+            reclaim_rate (float): Maximum keys unlinked per second.
+            metrics (bool): Time the methods decorated with
+            `count_calls`, and the serializer in `store` (recorded as
+            `Cache.store.encode`). See `CallMetrics` and `report`.
+            metrics_interval (float): Seconds between metrics flushes.
+            The metrics are shared by the caches of a server: the first
+            cache to enable them sets the interval.
+            metrics_background (bool): Also flush the metrics from a
+            background thread, shared as well, every interval.
 
         Returns:
             None
+
+        Raises:
+            ValueError: If `namespace` is empty or contains ":".
+        """
+        if not namespace or ":" in namespace:
+            raise ValueError("namespace must be non-empty, without ':'")
+        self._redis = redis_client if redis_client is not None \
+            else redis.Redis()
+        self.flush = self._redis.flushdb
+        self.namespace = namespace
+        self.generation_refresh = generation_refresh
+        self.reclaim_batch = reclaim_batch
+        self.reclaim_rate = reclaim_rate
+        self._generation = None
+        self._generation_read = 0.0
+        self._buffer = None
+        if buffered:
+            self._buffer = InstrumentationBuffer(
+                self._redis, flush_size, flush_interval, background_flush)
+        self._near = near_cache
+        self._serializer = serializer
+        self._metrics = None
+        if metrics:
+            self._metrics = CallMetrics.shared(
+                self._redis, metrics_interval, metrics_background)
+        if near_cache is not None:
+            # Only the keys of the namespace: other writes are not ours
+            near_cache.attach(self._redis, prefixes=[namespace + ":"])
+
+    @property
+    def generation(self) -> int:
+        """
+        The current generation of the namespace, re-read from Redis at
+        most every `generation_refresh` seconds.
+        """
+        now = time.monotonic()
+        if (self._generation is None or
+                now - self._generation_read >= self.generation_refresh):
+            self._generation = int(
+                self._redis.get(self.namespace + ":generation") or 0)
+            self._generation_read = now
+        return self._generation
+
+    def _key(self, key: str) -> str:
+        """
+        Return the Redis key holding `key` in the current generation
+        """
+        return "{}:{}:{}".format(self.namespace, self.generation, key)
+
+    def clear(self, reclaim: bool = True) -> int:
+        """
+        Empty the namespace in O(1) by bumping its generation. Keys of
+        older generations become unreachable at once.
+
+        Args:
+            reclaim (bool): Unlink the old keys from a background thread.
+
+        Returns:
+            int: The new generation.
         """
-        self._redis = redis.Redis()
-        self.flush = self._redis.flushdb()
+        self._generation = self._redis.incr(self.namespace + ":generation")
+        self._generation_read = time.monotonic()
+        if reclaim:
+            threading.Thread(target=self.reclaim, daemon=True).start()
+        return self._generation
+
+    def reclaim(self) -> int:
+        """
+        Unlink the keys of older generations of the namespace, scanning
+        and unlinking `reclaim_batch` keys at a time and sleeping to stay
+        under `reclaim_rate` keys per second.
+
+        Returns:
+            int: The number of keys unlinked.
+        """
+        self._generation = None
+        current = self.generation
+        pattern = self.namespace.translate(_GLOB_SPECIAL) + ":*"
+        prefix_len = len(self.namespace.encode("utf-8")) + 1
+        unlinked = 0
+        batch = []
+        keys = self._redis.scan_iter(match=pattern, count=self.reclaim_batch)
+        for key in itertools.chain(keys, [None]):
+            if key is not None:
+                parts = key[prefix_len:].split(b":", 1)
+                if (len(parts) == 2 and parts[0].isdigit() and
+                        int(parts[0]) < current):
+                    batch.append(key)
+            if batch and (key is None or len(batch) >= self.reclaim_batch):
+                unlinked += self._redis.unlink(*batch)
+                time.sleep(len(batch) / self.reclaim_rate)
+                batch = []
+        return unlinked
+
+    def flush_buffer(self) -> int:
+        """
+        Send every buffered write to Redis now.
+
+        Returns:
+            int: The number of operations flushed, 0 when unbuffered.
+        """
+        if self._buffer is None:
+            return 0
+        return self._buffer.flush()
+
+    def close(self) -> None:
+        """
+        Stop background flushing, flush any buffered writes and
+        metrics and stop near cache invalidation tracking.
+        """
+        if self._buffer is not None:
+            self._buffer.close()
+        if self._metrics is not None:
+            # Shared with the other caches: flush, leave it running
+            self._metrics.flush()
+        if self._near is not None:
+            self._near.detach()
 
     @count_calls
     @call_history
@@ -146,9 +868,110 @@ class Cache:
             str: The unique key used to store the data in the Redis cache.
         """
         key = str(uuid.uuid4())  # Generate a unique key
-        self._redis.set(key, data)  # Store the data in the Redis cache
+        if self._serializer is not None and self._metrics is not None:
+            start = time.perf_counter_ns()
+            data = self._serializer.dumps(data)
+            self._metrics.record(Cache.store.__qualname__ + ".encode",
+                                 time.perf_counter_ns() - start)
+        elif self._serializer is not None:
+            data = self._serializer.dumps(data)
+        if self._buffer is not None:
+            # The SET goes out in the same pipeline as the bookkeeping
+            self._buffer.set(self._key(key), data)
+        else:
+            # Store the data in the Redis cache
+            self._redis.set(self._key(key), data)
         return key  # Return the unique key used for storage
 
+    def store_many(self, values: Iterable[Union[str, bytes, int, float]],
+                   chunk_size: int = 1000) -> List[str]:
+        """
+        Store many values, one MSET per chunk of `chunk_size` values.
+
+        Each value is recorded by the `count_calls` and `call_history`
+        bookkeeping of `store` as one call, exactly as if `store` had
+        been called once per value, so `replay(cache.store)` covers
+        both paths.
+
+        Args:
+            values (Iterable): The values to store.
+            chunk_size (int): Values written per round trip. Smaller
+            chunks keep each command short on the server.
+
+        Returns:
+            List[str]: The generated keys, in the order of `values`.
+        """
+        qual_name = Cache.store.__qualname__
+        keys = []
+        for chunk in _chunks(values, chunk_size):
+            chunk_keys = [str(uuid.uuid4()) for _ in chunk]
+            if self._serializer is not None:
+                encoded = [self._serializer.dumps(value) for value in chunk]
+            else:
+                encoded = chunk
+            if self._buffer is not None:
+                sink = self._buffer
+            else:
+                sink = self._redis.pipeline(transaction=False)
+
+            # Same writes as store + call_history + count_calls, batched
+            sink.mset({self._key(key): data
+                       for key, data in zip(chunk_keys, encoded)})
+            maxlen = self.history_maxlen
+            for key, value in zip(chunk_keys, chunk):
+                sink.xadd(_history_key(qual_name),
+                          {"input": str((value,)), "output": key},
+                          maxlen=maxlen)
+            sink.incr(qual_name, len(chunk))
+
+            if self._buffer is not None:
+                self._buffer.tick()
+            else:
+                sink.execute()
+            keys.extend(chunk_keys)
+        return keys
+
+    def set_many(self, mapping: Mapping[str, Union[str, bytes, int, float]],
+                 ttl: Optional[int] = None) -> None:
+        """
+        Store values under caller-chosen keys of the namespace in one
+        pipeline. Unlike `store`, these writes are not instrumented.
+
+        Args:
+            mapping (Mapping): The values by key.
+            ttl (int, optional): Lifetime of the keys, in seconds.
+        """
+        if not mapping:
+            return
+        full_keys = []
+        pipe = self._redis.pipeline(transaction=False)
+        for key, data in mapping.items():
+            if self._serializer is not None:
+                data = self._serializer.dumps(data)
+            full_keys.append(self._key(key))
+            pipe.set(full_keys[-1], data, ex=ttl)
+        pipe.execute()
+        if self._near is not None:
+            # Tracking invalidations are asynchronous: drop our own
+            # stale copies now, after the SETs like in `delete`
+            self._near.invalidate(full_keys)
+
+    def delete(self, *keys: str) -> int:
+        """
+        Delete keys of the namespace.
+
+        Returns:
+            int: The number of keys that existed.
+        """
+        if not keys:
+            return 0
+        full_keys = [self._key(key) for key in keys]
+        deleted = self._redis.delete(*full_keys)
+        if self._near is not None:
+            # After the DELETE, so a racing get cannot cache the old value
+            self._near.invalidate(full_keys)
+        return deleted
+
     def get(self, key: str, fn: Callable = None) -> Union[str, int, None]:
         """
         Retrieve data from Redis using the specified 'key'.
@@ -159,14 +982,36 @@ class Cache:
             the data. Defaults to None.
 
         Returns:
-            Any: The retrieved data, optionally converted by 'fn'. Returns
+            Any: The retrieved data, decoded by the serializer if the
+            cache has one and optionally converted by 'fn'. Returns
             None if the key does not exist.
         """
-        data = self._redis.get(key)
+        key = self._key(key)
+        if self._buffer is not None and self._buffer.holds([key]):
+            # Read your own writes: a buffered SET of the key lands first
+            self._buffer.flush()
+
+        if self._near is None:
+            data = self._redis.get(key)
+        else:
+            data = self._near.get(key)
+            if data is None:
+                # Reserve the key first so a racing invalidation wins
+                token = self._near.reserve([key])
+                try:
+                    data = self._redis.get(key)
+                finally:
+                    if data is None:
+                        self._near.release([key], token)
+                if data is not None:
+                    self._near.put(key, data, token)
 
         if data is None:
             return None
 
+        if self._serializer is not None:
+            data = self._serializer.loads(data)
+
         if fn is not None:
             data = fn(data)
 
@@ -179,11 +1024,16 @@ class Cache:
         Args:
             key (str): The key to retrieve data from Redis.
 
+        With a serializer, a decoded str is returned as is and decoded
+        bytes are read as UTF-8.
+
         Returns:
             str: The retrieved data as a string, or None if the
             key does not exist.
         """
-        return self.get(key, str)
+        if self._serializer is None:
+            return self.get(key, str)
+        return self.get(key, _as_str)
 
     def get_int(self, key: str) -> int:
         """
@@ -192,8 +1042,64 @@ class Cache:
         Args:
             key (str): The key to retrieve data from Redis.
 
+        With a serializer, a decoded int is returned as is.
+
         Returns:
             int: The retrieved data as an integer, or None if the
             key does not exist.
         """
-        return self.get(key, int)
+        if self._serializer is None:
+            return self.get(key, int)
+        return self.get(key, _as_int)
+
+    def get_many(self, keys: Iterable[str], fn: Callable = None,
+                 chunk_size: int = 1000) -> list:
+        """
+        Retrieve many keys, one MGET per chunk of `chunk_size` keys.
+
+        Args:
+            keys (Iterable[str]): The keys to retrieve.
+            fn (Callable, optional): A callable applied to every value
+            of the batch that exists. Defaults to None.
+            chunk_size (int): Keys read per round trip.
+
+        Returns:
+            list: The values in the order of `keys`, with None for the
+            keys that do not exist.
+        """
+        keys = [self._key(key) for key in keys]
+        if self._buffer is not None and self._buffer.holds(keys):
+            self._buffer.flush()
+
+        values = []
+        for chunk in _chunks(keys, chunk_size):
+            if self._near is None:
+                values.extend(self._redis.mget(chunk))
+                continue
+
+            # Serve what we can locally and MGET only the misses
+            found = [self._near.get(key) for key in chunk]
+            missing = [i for i, data in enumerate(found) if data is None]
+            if missing:
+                missing_keys = [chunk[i] for i in missing]
+                token = self._near.reserve(missing_keys)
+                try:
+                    fetched = self._redis.mget(missing_keys)
+                except redis.RedisError:
+                    self._near.release(missing_keys, token)
+                    raise
+                for i, data in zip(missing, fetched):
+                    found[i] = data
+                    if data is not None:
+                        self._near.put(chunk[i], data, token)
+                    else:
+                        self._near.release([chunk[i]], token)
+            values.extend(found)
+
+        if self._serializer is not None:
+            loads = self._serializer.loads
+            values = [None if data is None else loads(data)
+                      for data in values]
+        if fn is not None:
+            values = [None if data is None else fn(data) for data in values]
+        return values
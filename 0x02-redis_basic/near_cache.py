@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+an in-process LRU near cache kept coherent with redis
+through server-assisted client tracking
+"""
+import collections
+import sys
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+import redis
+
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+def _merge_prefixes(prefixes: Iterable[str]) -> list:
+    """
+    Return `prefixes` without the ones another prefix covers, in order
+    """
+    prefixes = list(dict.fromkeys(prefixes))
+    return [prefix for prefix in prefixes
+            if not any(prefix != other and prefix.startswith(other)
+                       for other in prefixes)]
+
+
+class NearCache:
+    """
+    A bounded, thread-safe LRU of raw values read from Redis.
+
+    Entries expire after `ttl` seconds. Once `attach`ed to a client,
+    the cache subscribes to Redis invalidation messages (CLIENT TRACKING
+    in broadcast mode for its key prefixes, redirected to a pub/sub
+    connection) and drops keys as soon as they are modified on the
+    server. When tracking is not available the cache runs in TTL-only
+    mode.
+
+    A read from Redis is cached only if no invalidation of its key
+    arrived while it was in flight: `reserve` the key before the read
+    and hand the token back to `put`.
+    """
+
+    def __init__(self, max_entries: int = 10000,
+                 max_bytes: int = 64 * 1024 * 1024, ttl: float = 60.0,
+                 prefixes: Iterable[str] = ()):
+        """
+        Args:
+            max_entries (int): Maximum number of cached keys.
+            max_bytes (int): Approximate bound on the memory held by keys
+            and values.
+            ttl (float): Default lifetime of an entry, in seconds.
+            prefixes (Iterable[str]): Only track keys starting with one
+            of these prefixes. Defaults to the prefixes passed to
+            `attach`, or to every key if there are none.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.prefixes = _merge_prefixes(prefixes)
+        self.tracking = False
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Token of the read in flight per key, dropped by invalidations
+        # so that a value read before one arrived is never cached
+        self._reserved = {}
+        self._pubsub = None
+        self._tracker = None
+        self._redirect = None
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(key) -> bytes:
+        """Normalize keys to the bytes Redis sends in invalidations"""
+        return key.encode("utf-8") if isinstance(key, str) else bytes(key)
+
+    @staticmethod
+    def _size(key: bytes, value) -> int:
+        """Approximate memory used by an entry"""
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return len(key) + len(value)
+        return len(key) + sys.getsizeof(value)
+
+    def get(self, key):
+        """
+        Return the cached value of `key`, or None on a miss.
+        """
+        key = self._key(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires, size = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def reserve(self, keys: Iterable) -> object:
+        """
+        Mark `keys` as being read from Redis.
+
+        Returns:
+            object: The token to pass to `put` or `release`.
+        """
+        token = object()
+        with self._lock:
+            for key in keys:
+                self._reserved[self._key(key)] = token
+        return token
+
+    def release(self, keys: Iterable, token: object) -> None:
+        """
+        Drop the reservations of `keys` made with `token`, for the reads
+        that failed or found nothing.
+        """
+        with self._lock:
+            for key in keys:
+                key = self._key(key)
+                if self._reserved.get(key) is token:
+                    del self._reserved[key]
+
+    def put(self, key, value, token: object,
+            ttl: Optional[float] = None) -> None:
+        """
+        Cache `value` for `key` unless the key was invalidated, or
+        reserved again, since it was reserved with `token`.
+
+        Args:
+            key: The Redis key.
+            value: The raw value read from Redis.
+            token (object): The token returned by `reserve`.
+            ttl (float, optional): Lifetime of this entry. Defaults to
+            the cache `ttl`.
+        """
+        key = self._key(key)
+        size = self._size(key, value)
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if self._reserved.get(key) is not token:
+                return
+            del self._reserved[key]
+            if size > self.max_bytes:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (value, expires, size)
+            self._bytes += size
+            # Evict least recently used entries until within bounds
+            while (len(self._entries) > self.max_entries or
+                   self._bytes > self.max_bytes):
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    def invalidate(self, keys: Optional[Iterable] = None) -> None:
+        """
+        Drop `keys` from the cache, or every entry when `keys` is None.
+        """
+        with self._lock:
+            if keys is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._reserved.clear()
+                self._bytes = 0
+                return
+            for key in keys:
+                key = self._key(key)
+                self._reserved.pop(key, None)
+                entry = self._entries.pop(key, None)
+                if entry is not None:
+                    self._bytes -= entry[2]
+                    self.invalidations += 1
+
+    def stats(self) -> dict:
+        """
+        Return hit, miss and eviction counters and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "tracking": self.tracking,
+            }
+
+    def attach(self, client: redis.Redis,
+               prefixes: Iterable[str] = ()) -> bool:
+        """
+        Subscribe to invalidation messages for the server of `client`.
+
+        Args:
+            client (redis.Redis): A client of the server to track.
+            prefixes (Iterable[str]): Key prefixes to track in addition
+            to the `prefixes` of the cache, e.g. the namespace of the
+            Cache attaching it. Tracking is added to an already attached
+            cache for the prefixes it does not cover yet.
+
+        Returns:
+            bool: True if client tracking is enabled, False if the cache
+            fell back to TTL-only mode.
+        """
+        merged = _merge_prefixes(self.prefixes + list(prefixes))
+        if self.tracking:
+            # Without prefixes every key is tracked already
+            if not self.prefixes or merged == self.prefixes:
+                return True
+            try:
+                if set(self.prefixes) <= set(merged):
+                    self._track([prefix for prefix in merged
+                                 if prefix not in self.prefixes])
+                else:
+                    # A new prefix covers tracked ones, which the server
+                    # rejects as an overlap: track the merged set anew
+                    self._tracker.execute_command("CLIENT", "TRACKING",
+                                                  "OFF")
+                    self._track(merged)
+                    # Invalidations sent in between were missed
+                    self.invalidate()
+            except redis.RedisError:
+                self.detach()
+                return False
+            self.prefixes = merged
+            return True
+        self.prefixes = merged
+
+        pool = client.connection_pool
+        name = "near-cache-" + uuid.uuid4().hex
+        kwargs = dict(pool.connection_kwargs, client_name=name)
+        try:
+            listener = redis.Redis(connection_pool=redis.ConnectionPool(
+                connection_class=pool.connection_class, **kwargs))
+            self._pubsub = listener.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(
+                **{INVALIDATE_CHANNEL: self._on_invalidate})
+
+            # The listener connection was named on connect: find its id
+            self._redirect = next(info["id"] for info in client.client_list()
+                                  if info.get("name") == name)
+
+            # Tracking lasts as long as the connection that enabled it
+            self._tracker = redis.Redis(connection_pool=redis.ConnectionPool(
+                connection_class=pool.connection_class,
+                **pool.connection_kwargs), single_connection_client=True)
+            self._track(self.prefixes)
+        except (redis.RedisError, StopIteration):
+            self.detach()
+            return False
+
+        self._thread = self._pubsub.run_in_thread(
+            sleep_time=1.0, daemon=True,
+            exception_handler=self._on_listener_error)
+        self.tracking = True
+        return True
+
+    def _track(self, prefixes: list) -> None:
+        """Enable broadcast tracking of `prefixes`, or of every key"""
+        args = ["CLIENT", "TRACKING", "ON", "REDIRECT", self._redirect,
+                "BCAST"]
+        for prefix in prefixes:
+            args.extend(["PREFIX", prefix])
+        self._tracker.execute_command(*args)
+
+    def detach(self) -> None:
+        """
+        Stop tracking and fall back to TTL-only mode.
+        """
+        self.tracking = False
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        for closable in (self._pubsub, self._tracker):
+            if closable is not None:
+                try:
+                    closable.close()
+                except redis.RedisError:
+                    pass
+        self._pubsub = None
+        self._tracker = None
+        self._redirect = None
+
+    def _on_invalidate(self, message: dict) -> None:
+        """Handle a message of the invalidation channel"""
+        # A nil payload means the server flushed its whole keyspace
+        self.invalidate(message["data"])
+
+    def _on_listener_error(self, error, pubsub, thread) -> None:
+        """
+        Invalidation messages may have been lost: stop tracking, empty
+        the cache and continue in TTL-only mode.
+        """
+        self.detach()
+        self.invalidate()
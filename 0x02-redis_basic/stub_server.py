@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+a local HTTP server answering every GET after an artificial delay,
+used by the web.py benchmarks
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class DelayedHandler(BaseHTTPRequestHandler):
+    """Answer every GET with a small page after `delay` seconds"""
+    delay = 0.5
+    fetches = 0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        """Count the fetch, sleep, then answer"""
+        with DelayedHandler._lock:
+            DelayedHandler.fetches += 1
+        time.sleep(self.delay)
+        body = "<html><body>{}</body></html>".format(self.path).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Keep benchmark output quiet"""
+
+
+class StubServer(ThreadingHTTPServer):
+    """A threading server sized for many concurrent clients"""
+    # The default backlog of 5 drops connections under concurrent load
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start(delay: float = 0.5) -> ThreadingHTTPServer:
+    """
+    Start a delayed server on a free local port in a daemon thread.
+
+    Returns:
+        ThreadingHTTPServer: The server; its base URL is `url(server)`.
+    """
+    DelayedHandler.delay = delay
+    DelayedHandler.fetches = 0
+    server = StubServer(("127.0.0.1", 0), DelayedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def url(server: ThreadingHTTPServer, path: str = "/") -> str:
+    """Return the URL of `path` on `server`"""
+    return "http://127.0.0.1:{}{}".format(server.server_address[1], path)
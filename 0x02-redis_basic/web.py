@@ -2,39 +2,124 @@
 import redis
 import requests
 import functools
+import threading
+import time
+import uuid
 
 redis_client = redis.Redis()
 
+# Delete a lock only if it still holds our token
+_release_lock = redis_client.register_script("""
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+""")
 
-def url_access_count(method):
+
+def url_access_count(method=None, *, single_flight: bool = False,
+                     soft_ttl: float = None, hard_ttl: int = 10,
+                     lock_timeout: float = 30.0, wait: float = None,
+                     poll_interval: float = 0.05):
     """
     decorator function for caching and counting URL accesses
+
+    Used bare, a page is cached for `hard_ttl` (10) seconds and every
+    miss fetches it. Options protect slow upstreams from stampedes:
+
+    Args:
+        single_flight (bool): On a miss, only the worker holding the
+        `lock:<url>` lease fetches the page; the others poll the cache
+        and take over the lease if it is released without a page (the
+        fetch failed) or expires (its holder died).
+        soft_ttl (float, optional): Seconds after which a cached page is
+        stale. Stale pages are served while a single background refresh
+        runs, until the page expires after `hard_ttl` seconds.
+        lock_timeout (float): Lifetime of a lease, in case its holder
+        dies.
+        wait (float, optional): How long followers wait for a page
+        before raising TimeoutError. Defaults to `lock_timeout`.
+        poll_interval (float): Delay between cache polls of followers.
     """
-    @functools.wraps(method)
-    def wrapper(url):
-        # Create keys for caching and counting
-        cache_key = "cached:" + url
-        count_key = "count:" + url
+    if soft_ttl is not None and soft_ttl >= hard_ttl:
+        raise ValueError("soft_ttl must be shorter than hard_ttl")
+    if wait is None:
+        wait = lock_timeout
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(url):
+            # Create keys for caching and counting
+            cache_key = "cached:" + url
+            count_key = "count:" + url
+            fresh_key = "fresh:" + url
+            lock_key = "lock:" + url
+
+            def fetch():
+                # If not cached, fetch new content
+                html_content = method(url)
+
+                # Update the count and the cached content in one trip
+                pipe = redis_client.pipeline()
+                pipe.incr(count_key)
+                pipe.setex(cache_key, hard_ttl, html_content)
+                if soft_ttl is not None:
+                    pipe.psetex(fresh_key, int(soft_ttl * 1000), 1)
+                pipe.execute()
+                return html_content
+
+            def acquire():
+                token = uuid.uuid4().hex
+                if redis_client.set(lock_key, token, nx=True,
+                                    px=int(lock_timeout * 1000)):
+                    return token
+                return None
+
+            def fetch_and_release(token):
+                try:
+                    return fetch()
+                finally:
+                    _release_lock(keys=[lock_key], args=[token])
 
-        # Try to retrieve cached content from Redis
-        cached_content = redis_client.get(cache_key)
+            # Try to retrieve cached content from Redis
+            cached_content, fresh = redis_client.mget(cache_key, fresh_key)
 
-        if cached_content:
-            # Return cached content as a UTF-8 decoded string
-            return cached_content.decode("utf-8")
+            if cached_content:
+                if soft_ttl is not None and not fresh:
+                    # Stale: one worker refreshes in the background
+                    token = acquire()
+                    if token is not None:
+                        threading.Thread(target=fetch_and_release,
+                                         args=(token,), daemon=True).start()
+                # Return cached content as a UTF-8 decoded string
+                return cached_content.decode("utf-8")
 
-        # If not cached, fetch new content
-        html_content = method(url)
+            if not single_flight:
+                return fetch()
 
-        # Update the count in Redis
-        redis_client.incr(count_key)
+            token = acquire()
+            if token is not None:
+                return fetch_and_release(token)
 
-        # Set the cached content with an expiration of 10 seconds
-        redis_client.setex(cache_key, 10, html_content)
+            # Another worker is fetching: wait for its result, never
+            # fetching without the lease
+            deadline = time.monotonic() + wait
+            while time.monotonic() < deadline:
+                time.sleep(poll_interval)
+                cached_content = redis_client.get(cache_key)
+                if cached_content:
+                    return cached_content.decode("utf-8")
+                token = acquire()
+                if token is not None:
+                    return fetch_and_release(token)
+            raise TimeoutError("no page for {} after waiting {}s".format(
+                url, wait))
 
-        return html_content
+        return wrapper
 
-    return wrapper
+    if method is not None:
+        return decorator(method)
+    return decorator
 
 
 @url_access_count
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+asynchronous counterpart of web.py: fetch many pages concurrently
+over pooled HTTP and Redis connections, with the same cached:<url>
+and count:<url> keys
+"""
+import asyncio
+from typing import Iterable, List
+import aiohttp
+import redis.asyncio
+
+# Same lifetime as the default of web.url_access_count
+CACHE_TTL = 10
+
+redis_client = redis.asyncio.Redis()
+
+# Shared HTTP session, opened on first use, see `http_session` and `close`
+_session = None
+_session_loop = None
+
+
+def http_session() -> aiohttp.ClientSession:
+    """
+    Return the module HTTP session, opening it on first use, so pages
+    fetched by successive calls reuse its pooled connections.
+
+    A session belongs to the event loop it was opened in: a new one is
+    opened for another loop (a later `asyncio.run`, for instance).
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = aiohttp.ClientSession()
+        _session_loop = loop
+    return _session
+
+
+async def close() -> None:
+    """Close the module HTTP session, if open."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+    _session_loop = None
+
+
+async def get_pages(urls: Iterable[str], concurrency: int = 10,
+                    session: aiohttp.ClientSession = None,
+                    client: redis.asyncio.Redis = None) -> List[str]:
+    """
+    Obtain the HTML content of many URLs.
+
+    Cached pages are looked up with a single MGET, only the misses are
+    fetched (at most `concurrency` at a time) and every fetched page is
+    cached and counted in a single pipeline.
+
+    Args:
+        urls (Iterable[str]): The URLs to obtain.
+        concurrency (int): Maximum number of simultaneous fetches.
+        session (aiohttp.ClientSession, optional): Defaults to the
+        module session, see `http_session`.
+        client (redis.asyncio.Redis, optional): Defaults to the module
+        `redis_client`.
+
+    Returns:
+        List[str]: The pages, in the order of `urls`.
+
+    Raises:
+        aiohttp.ClientError: The first fetch error, raised once every
+        successful fetch has been cached.
+    """
+    r = client if client is not None else redis_client
+    urls = list(urls)
+    unique = list(dict.fromkeys(urls))
+    if not unique:
+        return []
+
+    cached = await r.mget(["cached:" + url for url in unique])
+    pages = {url: content.decode("utf-8")
+             for url, content in zip(unique, cached) if content}
+    misses = [url for url in unique if url not in pages]
+
+    if misses:
+        semaphore = asyncio.Semaphore(concurrency)
+        if session is None:
+            session = http_session()
+
+        async def fetch(url: str) -> str:
+            async with semaphore:
+                async with session.get(url) as response:
+                    return await response.text()
+
+        results = await asyncio.gather(*(fetch(url) for url in misses),
+                                       return_exceptions=True)
+
+        errors = []
+        async with r.pipeline(transaction=False) as pipe:
+            for url, result in zip(misses, results):
+                if isinstance(result, BaseException):
+                    errors.append(result)
+                    continue
+                pipe.incr("count:" + url)
+                pipe.setex("cached:" + url, CACHE_TTL, result)
+                pages[url] = result
+            await pipe.execute()
+        if errors:
+            raise errors[0]
+
+    return [pages[url] for url in urls]
+
+
+async def get_page_async(url: str, session: aiohttp.ClientSession = None,
+                         client: redis.asyncio.Redis = None) -> str:
+    """Obtain the HTML content of a particular URL"""
+    return (await get_pages([url], session=session, client=client))[0]
+
+
+async def main() -> None:
+    """Example usage of get_page_async"""
+    try:
+        print(await get_page_async('http://slowwly.robertomurray.co.uk'))
+    finally:
+        await close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())